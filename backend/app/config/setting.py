@@ -1,8 +1,102 @@
-from pydantic import BaseModel
-from typing import List, Optional
+import os
+from pydantic import BaseModel, Field, model_validator
+from typing import Dict, List, Literal, Optional
 
-class SearchQuery(BaseModel):
+# Runtime settings (overridable through environment variables)
+HEADLESS = int(os.getenv("HEADLESS", "1"))
+CHROME_BINARY = os.getenv("CHROME_BINARY", "/usr/bin/chromium")
+CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH")  # skip webdriver_manager when set
+MAPS_URL = os.getenv("MAPS_URL", "https://www.google.com/maps")
+DRIVER_POOL_SIZE = int(os.getenv("DRIVER_POOL_SIZE", "2"))
+RESOURCE_PROFILE = os.getenv("RESOURCE_PROFILE", "full")  # see scraper/resources.py; "minimal" loads less
+RESOURCE_STATS = int(os.getenv("RESOURCE_STATS", "0"))  # count requests/bytes of every page read
+DRIVER_LEASE_TIMEOUT = float(os.getenv("DRIVER_LEASE_TIMEOUT", "300"))
+DRIVER_MAX_PAGES = int(os.getenv("DRIVER_MAX_PAGES", "200"))  # pages before a pooled browser is recycled, 0 = never
+DRIVER_MAX_RSS_MB = float(os.getenv("DRIVER_MAX_RSS_MB", "1500"))  # browser tree memory that forces a recycle, 0 = never
+REAP_INTERVAL = float(os.getenv("REAP_INTERVAL", "60"))  # seconds between orphaned browser sweeps, 0 = never
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", str(DRIVER_POOL_SIZE)))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "32"))  # waiting jobs before rejecting
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "200"))  # finished jobs kept for polling
+QUEUE_PATH = os.getenv("QUEUE_PATH", "")  # SQLite job queue shared with workers; empty runs /jobs in-process
+QUEUE_MAX_DEPTH = int(os.getenv("QUEUE_MAX_DEPTH", "1000"))  # queued jobs before rejecting
+QUEUE_LEASE_SECONDS = float(os.getenv("QUEUE_LEASE_SECONDS", "60"))  # silence after which a worker's job is retried
+QUEUE_MAX_ATTEMPTS = int(os.getenv("QUEUE_MAX_ATTEMPTS", "3"))  # tries per queued job before it fails
+QUEUE_POLL_INTERVAL = float(os.getenv("QUEUE_POLL_INTERVAL", "1"))  # seconds between a worker's queue checks
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", str(JOB_WORKERS)))  # queued jobs one worker runs at once
+STREAM_PROGRESS_INTERVAL = float(os.getenv("STREAM_PROGRESS_INTERVAL", "2"))  # seconds between progress events
+NAVIGATION_MAX_RETRIES = int(os.getenv("NAVIGATION_MAX_RETRIES", "3"))  # default max_retries per page
+SCROLL_WAIT = float(os.getenv("SCROLL_WAIT", "5"))  # max seconds to wait for the feed to grow
+SCROLL_MAX_STALLS = int(os.getenv("SCROLL_MAX_STALLS", "3"))  # growth-less steps before giving up
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "20"))  # links buffered between scroller and parsers
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "500"))  # queries accepted by /scrape/batch
+PLACE_STORE_PATH = os.getenv("PLACE_STORE_PATH", "data/places.sqlite3")  # empty disables the store
+PLACE_MAX_AGE = float(os.getenv("PLACE_MAX_AGE", str(24 * 3600)))  # default max_age_seconds
+EXPORT_ROW_GROUP = int(os.getenv("EXPORT_ROW_GROUP", "10000"))  # rows per parquet row group in exports
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", "data/checkpoints")  # empty disables job checkpoints
+TILE_VIEWPORT_PX = int(os.getenv("TILE_VIEWPORT_PX", "600"))  # map width a tile's zoom is chosen for
+TILE_RESULT_CAP = int(os.getenv("TILE_RESULT_CAP", "120"))  # feed length at which a tile is split
+PLACE_HTTP_WORKERS = int(os.getenv("PLACE_HTTP_WORKERS", "8"))  # concurrent place page fetches of the http engine
+PLACE_HTTP_TIMEOUT = float(os.getenv("PLACE_HTTP_TIMEOUT", "10"))
+EMAIL_WORKERS = int(os.getenv("EMAIL_WORKERS", "16"))  # concurrent website lookups
+EMAIL_PER_HOST = int(os.getenv("EMAIL_PER_HOST", "2"))
+EMAIL_MAX_BYTES = int(os.getenv("EMAIL_MAX_BYTES", "1000000"))
+EMAIL_TIMEOUT = float(os.getenv("EMAIL_TIMEOUT", "10"))
+EMAIL_MAX_PAGES = int(os.getenv("EMAIL_MAX_PAGES", "3"))  # linked contact/about pages read per website
+EMAIL_CACHE_PATH = os.getenv("EMAIL_CACHE_PATH", "data/email_cache.sqlite3")  # empty disables the cache
+EMAIL_CACHE_TTL = float(os.getenv("EMAIL_CACHE_TTL", str(7 * 24 * 3600)))
+EMAIL_CACHE_MAX_ENTRIES = int(os.getenv("EMAIL_CACHE_MAX_ENTRIES", "50000"))
+
+class ScrapeOptions(BaseModel):
+    concurrency: int = Field(1, ge=1, le=16, description="Browsers used in parallel for place pages")
+    refresh_email_cache: bool = Field(False, description="Re-crawl websites even when their emails are cached")
+    mode: Literal["full", "feed", "hybrid"] = Field(
+        "full",
+        description="full: open every place page; feed: use the result cards only; "
+                    "hybrid: open place pages only for cards missing phone/website"
+    )
+    engine: Literal["script", "soup", "http"] = Field(
+        "script",
+        description="script: extract place pages in one in-browser call; soup: parse their HTML with BeautifulSoup; "
+                    "http: fetch place pages without a browser, opening only the ones that could not be read"
+    )
+    pipeline: bool = Field(True, description="Parse place pages on idle pooled browsers while the feed is still scrolling")
+    include_timings: bool = Field(False, description="Add a per-stage timing breakdown to the response")
+    max_results: Optional[int] = Field(None, ge=1, description="Stop scrolling once this many places were found")
+    deadline_seconds: Optional[float] = Field(
+        None, gt=0, description="Wind the job down this many seconds after it starts and return what it has"
+    )
+    max_retries: int = Field(
+        NAVIGATION_MAX_RETRIES, ge=0, le=20, description="Navigation retries per page before the page is skipped"
+    )
+    max_age_seconds: float = Field(
+        PLACE_MAX_AGE, ge=0, description="Reuse places scraped less than this long ago; 0 scrapes every place again"
+    )
+
+class Tiling(BaseModel):
+    """Area a tiled search covers: ``bbox`` [south, west, north, east] or
+    ``center`` [lat, lng] with ``radius_km``"""
+    bbox: Optional[List[float]] = Field(None, min_length=4, max_length=4)
+    center: Optional[List[float]] = Field(None, min_length=2, max_length=2)
+    radius_km: Optional[float] = Field(None, gt=0, le=500)
+    grid: int = Field(2, ge=1, le=10, description="Tiles per side of the initial grid")
+    max_depth: int = Field(2, ge=0, le=4, description="Times a capped tile may be split again")
+    split: int = Field(2, ge=2, le=4, description="Sub-tiles per side when a tile is split")
+    cap: int = Field(TILE_RESULT_CAP, ge=1, description="Feed length at which a tile counts as cut off")
+
+    @model_validator(mode="after")
+    def check_area(self) -> "Tiling":
+        if self.bbox is None and (self.center is None or self.radius_km is None):
+            raise ValueError("tiling needs a bbox, or a center and radius_km")
+        if self.bbox is not None and not (self.bbox[0] < self.bbox[2] and self.bbox[1] < self.bbox[3]):
+            raise ValueError("bbox must be [south, west, north, east]")
+        return self
+
+class SearchQuery(ScrapeOptions):
     query: str
+    tiling: Optional[Tiling] = Field(None, description="Search the area tile by tile instead of as one feed")
+
+class BatchQuery(ScrapeOptions):
+    queries: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_QUERIES)
 
 class Location(BaseModel):
     category: Optional[str] = None
@@ -18,6 +112,68 @@ class Location(BaseModel):
     rating: Optional[str] = None
     hours: Optional[str] = None
 
+    @classmethod
+    def from_record(cls, item: dict) -> "Location":
+        """Build a Location from a raw Parser record"""
+        return cls(
+            category=item.get("Category"),
+            name=item.get("Name"),
+            phone=item.get("Phone"),
+            google_maps_url=item.get("Google Maps URL"),
+            website=item.get("Website"),
+            email=item.get("email"),
+            business_status=item.get("Business Status"),
+            address=item.get("Address"),
+            total_reviews=item.get("Total Reviews"),
+            booking_links=item.get("Booking Links"),
+            rating=item.get("Rating"),
+            hours=item.get("Hours")
+        )
+
+class StageTiming(BaseModel):
+    count: int
+    seconds: float
+
+class TileStats(BaseModel):
+    tile: str
+    depth: int = 0
+    links_found: int = 0
+    new_places: int = 0
+    subdivided: bool = False
+
 class ScraperResponse(BaseModel):
     total_results: int
-    locations: List[Location]
\ No newline at end of file
+    locations: List[Location]
+    tiles: Optional[List[TileStats]] = None
+    truncated: bool = False
+    truncated_reason: Optional[str] = None  # "max_results" or "deadline"
+    timings: Optional[Dict[str, StageTiming]] = None
+
+class BatchLocation(Location):
+    queries: List[str] = []  # every query whose results listed this place
+
+class BatchQueryStats(BaseModel):
+    query: str
+    links_found: int = 0
+    new_places: int = 0  # places no earlier query of the batch had found
+
+class BatchResponse(BaseModel):
+    total_results: int
+    locations: List[BatchLocation]
+    queries: List[BatchQueryStats]
+    truncated: bool = False
+    truncated_reason: Optional[str] = None
+    timings: Optional[Dict[str, StageTiming]] = None
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str
+    query: str
+    links_found: int = 0
+    places_parsed: int = 0
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    attempts: Optional[int] = None  # queued jobs: tries so far, including the current one
+    worker: Optional[str] = None  # queued jobs: worker that leased it last
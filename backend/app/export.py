@@ -0,0 +1,86 @@
+import csv
+import io
+import json
+import tempfile
+from config.setting import Location, BatchLocation, EXPORT_ROW_GROUP
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # parquet exports are then unavailable
+    pyarrow = None
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+# Bytes handed to the response per chunk of a parquet file
+CHUNK_SIZE = 64 * 1024
+
+
+def columns(batch: bool = False) -> list:
+    return list((BatchLocation if batch else Location).model_fields)
+
+
+def rows(records, batch: bool = False):
+    """Flat dicts for ``records``: Locations, or raw records from a checkpoint log"""
+    for record in records:
+        if not isinstance(record, Location):
+            record = Location.from_record(record)
+        row = record.model_dump()
+        if batch:
+            row["queries"] = "; ".join(row["queries"])
+        yield row
+
+
+def stream_csv(rows, columns: list):
+    """CSV text, one row per chunk"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_jsonl(rows, columns: list = None):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + "\n"
+
+
+def stream_parquet(rows, columns: list, row_group: int = EXPORT_ROW_GROUP):
+    """A parquet file written ``row_group`` rows at a time to a temporary
+    file (the footer is only known at the end), then sent in chunks"""
+    schema = pyarrow.schema([(column, pyarrow.string()) for column in columns])
+    with tempfile.TemporaryFile() as spool:
+        with pyarrow.parquet.ParquetWriter(spool, schema) as writer:
+            group = {column: [] for column in columns}
+            size = groups = 0
+            for row in rows:
+                for column in columns:
+                    group[column].append(row.get(column))
+                size += 1
+                if size >= row_group:
+                    writer.write_table(pyarrow.table(group, schema=schema))
+                    group = {column: [] for column in columns}
+                    size = 0
+                    groups += 1
+            # An empty export still gets one (empty) row group
+            if size or not groups:
+                writer.write_table(pyarrow.table(group, schema=schema))
+        spool.seek(0)
+        while True:
+            chunk = spool.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def stream(records, format: str, batch: bool = False):
+    """Export ``records`` (any iterable) as ``format`` without collecting them"""
+    writers = {"csv": stream_csv, "jsonl": stream_jsonl, "parquet": stream_parquet}
+    return writers[format](rows(records, batch), columns(batch))
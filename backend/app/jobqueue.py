@@ -0,0 +1,377 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from functools import cached_property
+from jobs import JobQueueFull
+from scraper.checkpoint import Checkpoint
+from config.setting import (
+    ScraperResponse, SearchQuery, Location, JobStatus, JOB_HISTORY,
+    QUEUE_PATH, QUEUE_MAX_DEPTH, QUEUE_LEASE_SECONDS, QUEUE_MAX_ATTEMPTS
+)
+
+# Seconds before a job that raised is retried, doubled on every further attempt
+RETRY_BACKOFF = 15
+
+
+class QueuedJob:
+    """A snapshot of one row of the job queue, shaped like a Job for the
+    Job API"""
+
+    def __init__(self, row: sqlite3.Row) -> None:
+        self.id = row["id"]
+        self.search = SearchQuery.model_validate_json(row["search"])
+        self.status = row["status"]
+        self.error = row["error"]
+        self.attempts = row["attempts"]
+        self.worker = row["worker"]
+        self.links_found = row["links_found"]
+        self.places_parsed = row["places_parsed"]
+        self.created_at = row["created_at"]
+        self.started_at = row["started_at"]
+        self.finished_at = row["finished_at"]
+        self._result = json.loads(row["result"]) if row["result"] else None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    @property
+    def query(self) -> str:
+        return self.search.query
+
+    @cached_property
+    def checkpoint(self):
+        return Checkpoint(self.id) if Checkpoint.exists(self.id) else None
+
+    @cached_property
+    def result(self) -> ScraperResponse:
+        """The response the worker reported; its locations are read back
+        from the checkpoint when the job had one"""
+        if self._result is None:
+            return None
+        if "locations" in self._result:
+            return ScraperResponse(**self._result)
+        records = self.checkpoint.records() if self.checkpoint else []
+        return ScraperResponse(**self._result, locations=[Location.from_record(item) for item in records])
+
+    def to_status(self) -> JobStatus:
+        return JobStatus(
+            job_id=self.id,
+            status=self.status,
+            query=self.query,
+            links_found=self.links_found,
+            places_parsed=self.places_parsed,
+            error=self.error,
+            created_at=self.created_at,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            attempts=self.attempts,
+            worker=self.worker
+        )
+
+
+class JobQueue:
+    """Durable SQLite queue of ``SearchQuery`` jobs shared by the API and
+    any number of worker processes (see worker.py).
+
+    The API ``put``s jobs; a worker ``lease``s the oldest queued one for
+    ``lease_seconds`` and keeps the lease alive with ``heartbeat`` while it
+    runs. A job whose lease runs out, because its worker crashed or hung, is
+    leased again by the next worker that asks, up to ``max_attempts`` tries,
+    and continues from its checkpoint. Workers also record themselves in a
+    ``workers`` table on every poll, for the liveness endpoint.
+
+    Workers on other hosts need QUEUE_PATH and CHECKPOINT_DIR on storage
+    that every host and the API can reach.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str, lease_seconds: float = QUEUE_LEASE_SECONDS,
+                 max_attempts: int = QUEUE_MAX_ATTEMPTS, max_depth: int = QUEUE_MAX_DEPTH) -> None:
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Autocommit; transactions that must not interleave with other
+        # processes are opened with BEGIN IMMEDIATE
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " search TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " worker TEXT,"
+            " lease_until REAL,"
+            " available_at REAL NOT NULL,"
+            " cancel_requested INTEGER NOT NULL DEFAULT 0,"
+            " links_found INTEGER NOT NULL DEFAULT 0,"
+            " places_parsed INTEGER NOT NULL DEFAULT 0,"
+            " error TEXT,"
+            " result TEXT,"
+            " created_at REAL NOT NULL,"
+            " started_at REAL,"
+            " finished_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS workers ("
+            " id TEXT PRIMARY KEY,"
+            " host TEXT NOT NULL,"
+            " pid INTEGER NOT NULL,"
+            " concurrency INTEGER NOT NULL,"
+            " running INTEGER NOT NULL DEFAULT 0,"
+            " started_at REAL NOT NULL,"
+            " last_seen REAL NOT NULL,"
+            " stopped INTEGER NOT NULL DEFAULT 0)"
+        )
+
+    @classmethod
+    def shared(cls):
+        """The process-wide queue, or None when QUEUE_PATH is empty"""
+        if not QUEUE_PATH:
+            return None
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(QUEUE_PATH)
+            return cls._shared
+
+    @classmethod
+    def close_shared(cls) -> None:
+        with cls._shared_lock:
+            if cls._shared is not None:
+                cls._shared.close()
+                cls._shared = None
+
+    def _transaction(self, work):
+        """Run ``work(db)`` under a write lock held across processes"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(self._db)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return result
+
+    def put(self, search: SearchQuery, job_id: str = None) -> QueuedJob:
+        """Queue a scrape; raises JobQueueFull past ``max_depth`` waiting jobs"""
+        job_id = job_id or uuid.uuid4().hex
+
+        def put(db):
+            depth = db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if depth >= self.max_depth:
+                raise JobQueueFull("Too many scraping jobs queued, retry later")
+            now = time.time()
+            db.execute(
+                "INSERT INTO jobs (id, search, status, available_at, created_at) VALUES (?, ?, 'queued', ?, ?)",
+                (job_id, search.model_dump_json(), now, now)
+            )
+
+        self._transaction(put)
+        self.trim()
+        return self.get(job_id)
+
+    def get(self, job_id: str):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return QueuedJob(row) if row else None
+
+    def lease(self, worker: str):
+        """Take the oldest job that is queued or whose lease ran out, for
+        ``lease_seconds``; returns it, or None when there is nothing to run"""
+        def lease(db):
+            now = time.time()
+            # Expired leases that will not be retried
+            db.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ?"
+                " WHERE status = 'running' AND lease_until < ? AND cancel_requested = 1",
+                (now, now)
+            )
+            db.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?,"
+                " error = 'Worker ' || worker || ' stopped responding; out of attempts'"
+                " WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                (now, now, self.max_attempts)
+            )
+            row = db.execute(
+                "SELECT id, status FROM jobs"
+                " WHERE (status = 'queued' AND available_at <= ?) OR (status = 'running' AND lease_until < ?)"
+                " ORDER BY created_at LIMIT 1",
+                (now, now)
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, attempts = attempts + 1,"
+                " started_at = COALESCE(started_at, ?) WHERE id = ?",
+                (worker, now + self.lease_seconds, now, row["id"])
+            )
+            return row
+
+        row = self._transaction(lease)
+        if row is None:
+            return None
+        if row["status"] == "running":
+            print(f"Lease of job {row['id']} expired; retrying it on worker {worker}")
+        return self.get(row["id"])
+
+    def heartbeat(self, job_id: str, worker: str, links_found: int = 0, places_parsed: int = 0) -> bool:
+        """Extend a lease and record progress. False tells the worker to stop
+        the job: it was cancelled, or its lease was lost to another worker"""
+        with self._lock:
+            updated = self._db.execute(
+                "UPDATE jobs SET lease_until = ?, links_found = ?, places_parsed = ?"
+                " WHERE id = ? AND worker = ? AND status = 'running' AND cancel_requested = 0",
+                (time.time() + self.lease_seconds, links_found, places_parsed, job_id, worker)
+            ).rowcount
+        return updated == 1
+
+    def finish(self, job_id: str, worker: str, status: str, result: dict = None,
+               links_found: int = 0, places_parsed: int = 0) -> bool:
+        """Record the outcome of a leased job; ignored (False) when the lease
+        was lost in the meantime"""
+        with self._lock:
+            updated = self._db.execute(
+                "UPDATE jobs SET status = ?, result = ?, links_found = ?, places_parsed = ?, error = NULL,"
+                " lease_until = NULL, finished_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (status, json.dumps(result) if result is not None else None, links_found, places_parsed,
+                 time.time(), job_id, worker)
+            ).rowcount
+        return updated == 1
+
+    def release(self, job_id: str, worker: str, error: str = None) -> None:
+        """Give a leased job back. With ``error`` the attempt counts and the
+        job is retried after a backoff, or fails once out of attempts;
+        without, e.g. when the worker shuts down, it is queued again as if
+        never leased. A job the user cancelled meanwhile ends cancelled"""
+        def release(db):
+            row = db.execute(
+                "SELECT attempts, cancel_requested FROM jobs WHERE id = ? AND worker = ? AND status = 'running'",
+                (job_id, worker)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if row["cancel_requested"]:
+                db.execute(
+                    "UPDATE jobs SET status = 'cancelled', lease_until = NULL, finished_at = ? WHERE id = ?",
+                    (now, job_id)
+                )
+                return "cancelled"
+            if error is None:
+                db.execute(
+                    "UPDATE jobs SET status = 'queued', attempts = attempts - 1, lease_until = NULL,"
+                    " available_at = ? WHERE id = ?",
+                    (now, job_id)
+                )
+                return "queued"
+            if row["attempts"] >= self.max_attempts:
+                db.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, lease_until = NULL, finished_at = ? WHERE id = ?",
+                    (error, now, job_id)
+                )
+                return "failed"
+            db.execute(
+                "UPDATE jobs SET status = 'queued', error = ?, lease_until = NULL, available_at = ? WHERE id = ?",
+                (error, now + RETRY_BACKOFF * 2 ** (row["attempts"] - 1), job_id)
+            )
+            return "retry"
+
+        if self._transaction(release) == "retry":
+            print(f"Job {job_id} failed on worker {worker}; it will be retried: {error}")
+
+    def cancel(self, job_id: str):
+        """Cancel a queued job at once, or ask the worker running it to stop"""
+        def cancel(db):
+            now = time.time()
+            db.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (now, job_id)
+            )
+            db.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+
+        self._transaction(cancel)
+        return self.get(job_id)
+
+    def resume(self, job_id: str):
+        """Queue a cancelled or failed job again with fresh attempts; it
+        continues from its checkpoint"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'queued', attempts = 0, cancel_requested = 0, error = NULL,"
+                " available_at = ?, finished_at = NULL WHERE id = ? AND status IN ('cancelled', 'failed')",
+                (time.time(), job_id)
+            )
+        return self.get(job_id)
+
+    def counts(self) -> dict:
+        """Number of jobs per status"""
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def trim(self, history: int = JOB_HISTORY) -> None:
+        """Forget the oldest finished jobs beyond ``history``; checkpoints of
+        completed ones go with them"""
+        def trim(db):
+            rows = db.execute(
+                "SELECT id, status FROM jobs WHERE status IN ('done', 'failed', 'cancelled')"
+                " ORDER BY finished_at DESC LIMIT -1 OFFSET ?",
+                (history,)
+            ).fetchall()
+            db.executemany("DELETE FROM jobs WHERE id = ?", [(row["id"],) for row in rows])
+            return rows
+
+        for row in self._transaction(trim):
+            # Cancelled and failed jobs stay resumable from their checkpoint
+            if row["status"] == "done" and Checkpoint.exists(row["id"]):
+                Checkpoint(row["id"]).remove()
+
+    def beat(self, worker: str, host: str, pid: int, concurrency: int, running: int, stopped: bool = False) -> None:
+        """Record that ``worker`` is alive (or, with ``stopped``, that it exited)"""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO workers (id, host, pid, concurrency, running, started_at, last_seen, stopped)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET"
+                " concurrency = excluded.concurrency, running = excluded.running,"
+                " last_seen = excluded.last_seen, stopped = excluded.stopped",
+                (worker, host, pid, concurrency, running, now, now, int(stopped))
+            )
+
+    def workers(self, history: float = 24 * 3600) -> list:
+        """Workers seen in the last ``history`` seconds; a worker is alive
+        while it has checked in within ``lease_seconds``"""
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM workers WHERE last_seen >= ? ORDER BY started_at", (now - history,)
+            ).fetchall()
+        return [
+            {
+                "id": row["id"],
+                "host": row["host"],
+                "pid": row["pid"],
+                "concurrency": row["concurrency"],
+                "running": row["running"],
+                "started_at": row["started_at"],
+                "last_seen": row["last_seen"],
+                "alive": not row["stopped"] and now - row["last_seen"] < self.lease_seconds,
+            }
+            for row in rows
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,293 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from scraper.scraper import Backend
+from scraper.batch import BatchScraper
+from scraper.tiling import TiledScraper, plan_tiles, bbox_around
+from scraper.checkpoint import Checkpoint
+from scraper.common import JobContext
+from scraper.metrics import metrics
+from config.setting import (
+    ScraperResponse, SearchQuery, Location, JobStatus,
+    BatchQuery, BatchResponse, BatchLocation, BatchQueryStats, TileStats, CHECKPOINT_DIR
+)
+
+
+class JobQueueFull(Exception):
+    """Raised when the job queue has no room for another submission"""
+
+
+class Job:
+    def __init__(self, search, on_record=None, job_id: str = None, checkpoint: bool = False) -> None:
+        """``search`` is a SearchQuery, or a BatchQuery for a batch job.
+        With ``checkpoint`` a single-query job logs its feed and records to
+        disk (instead of keeping them in memory) so it can be resumed and
+        exported"""
+        self.id = job_id or uuid.uuid4().hex
+        self.search = search
+        self.checkpoint = None
+        if checkpoint and CHECKPOINT_DIR and isinstance(search, SearchQuery) and not search.tiling:
+            self.checkpoint = Checkpoint(self.id)
+            self.checkpoint.save_search(search.model_dump_json())
+        self.status = "queued"
+        self.error = None
+        self.result = None
+        self.backend = None
+        # Streamed jobs hand records to on_record instead of keeping them
+        self.context = JobContext(
+            refresh_emails=search.refresh_email_cache,
+            on_record=on_record,
+            retain_records=on_record is None and self.checkpoint is None,
+            max_results=search.max_results,
+            max_retries=search.max_retries,
+            max_age=search.max_age_seconds,
+            checkpoint=self.checkpoint
+        )
+        self.future: Future = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    @property
+    def query(self) -> str:
+        if isinstance(self.search, BatchQuery):
+            return "; ".join(self.search.queries)
+        return self.search.query
+
+    def to_status(self) -> JobStatus:
+        links_found = places_parsed = 0
+        if self.backend:
+            links_found = self.backend.links_found
+            places_parsed = self.backend.places_parsed
+        return JobStatus(
+            job_id=self.id,
+            status=self.status,
+            query=self.query,
+            links_found=links_found,
+            places_parsed=places_parsed,
+            error=self.error,
+            created_at=self.created_at,
+            started_at=self.started_at,
+            finished_at=self.finished_at
+        )
+
+
+class JobManager:
+    """Runs scraping jobs on a bounded thread pool, off the event loop.
+
+    At most ``workers`` jobs run at once and at most ``queue_size`` more may
+    wait; further submissions are rejected with JobQueueFull. Without
+    ``remove_checkpoints`` the checkpoints of forgotten jobs are left for
+    whoever reads their results (the job queue, for a worker).
+    """
+
+    def __init__(self, pool, workers: int, queue_size: int, history: int = 200, headless: int = 1,
+                 remove_checkpoints: bool = True):
+        self.pool = pool
+        self.headless = headless
+        self.history = history
+        self.remove_checkpoints = remove_checkpoints
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scrape")
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, search, on_record=None, job_id: str = None, checkpoint: bool = False) -> Job:
+        """Queue a scrape; ``on_record`` (called from worker threads) makes it
+        a streaming job that does not keep its records. ``checkpoint`` makes
+        it resumable (see Job)"""
+        if not self._slots.acquire(blocking=False):
+            raise JobQueueFull("Too many scraping jobs in progress, retry later")
+        try:
+            job = Job(search, on_record=on_record, job_id=job_id, checkpoint=checkpoint)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._jobs[job.id] = job
+            self._jobs.move_to_end(job.id)
+            self._trim()
+        job.future = self.executor.submit(self._run, job)
+        return job
+
+    def resume(self, job_id: str) -> Job:
+        """Restart a checkpointed job under its id, e.g. after a crash; it
+        parses from the first unfinished place, without scrolling again when
+        its feed was fully saved. Returns the job, or None without a checkpoint"""
+        job = self.get(job_id)
+        if job and not job.finished:
+            return job
+        if not Checkpoint.exists(job_id):
+            return None
+        search = SearchQuery.model_validate_json(Checkpoint(job_id).load_search())
+        return self.submit(search, job_id=job_id, checkpoint=True)
+
+    def cancel(self, job_id: str) -> Job:
+        """Stop a queued or running job; other jobs keep running"""
+        job = self.get(job_id)
+        if job and not job.finished:
+            job.context.cancel()
+        return job
+
+    def get(self, job_id: str) -> Job:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def counts(self) -> dict:
+        """Number of remembered jobs per status"""
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {status: statuses.count(status) for status in set(statuses)}
+
+    def _trim(self) -> None:
+        """Forget the oldest finished jobs beyond the history limit"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            job = self._jobs.pop(job_id)
+            # Cancelled and failed jobs stay resumable
+            if job.checkpoint and job.status == "done" and self.remove_checkpoints:
+                job.checkpoint.remove()
+
+    def _run(self, job: Job) -> ScraperResponse:
+        job.started_at = time.time()
+        try:
+            if job.context.is_cancelled():
+                job.status = "cancelled"
+                return None
+            job.status = "running"
+            # The deadline covers running time, not time spent queued
+            job.context.set_deadline(job.search.deadline_seconds)
+            if isinstance(job.search, BatchQuery):
+                locations = self._run_batch(job)
+                status = self._outcome(job)
+                job.result = BatchResponse(
+                    total_results=len(locations),
+                    locations=locations,
+                    queries=[BatchQueryStats(**stats) for stats in job.backend.query_stats()],
+                    truncated=job.context.truncated is not None,
+                    truncated_reason=job.context.truncated,
+                    timings=dict(job.context.timings) if job.search.include_timings else None
+                )
+                job.status = status
+                return job.result
+            if job.search.tiling:
+                return self._run_tiled(job)
+            job.backend = Backend(
+                searchquery=job.search.query,
+                outputformat="json",
+                healdessmode=self.headless,
+                pool=self.pool,
+                context=job.context,
+                concurrency=job.search.concurrency,
+                mode=job.search.mode,
+                engine=job.search.engine,
+                pipeline=job.search.pipeline
+            )
+            job.backend.mainscraping()
+
+            if job.context.on_record is not None and job.checkpoint:
+                # Streamed jobs keep nothing; exports read the checkpoint log
+                results = []
+            elif job.checkpoint:
+                results = job.checkpoint.records()
+            else:
+                results = job.backend.scroller.parser.finalData if job.backend.scroller.parser else []
+            locations = [Location.from_record(item) for item in results]
+            status = self._outcome(job)
+            job.result = ScraperResponse(
+                total_results=len(locations) if job.context.on_record is None else job.backend.scroller.places_parsed,
+                locations=locations,
+                truncated=job.context.truncated is not None,
+                truncated_reason=job.context.truncated,
+                timings=dict(job.context.timings) if job.search.include_timings else None
+            )
+            job.status = status
+            return job.result
+        except Exception as e:
+            print(f"Error during scraping job {job.id}: {str(e)}")
+            job.error = str(e)
+            job.status = "failed"
+            raise
+        finally:
+            job.finished_at = time.time()
+            metrics.inc("jobs_total", status=job.status)
+            metrics.observe("job", job.finished_at - job.started_at)
+            if job.backend:
+                try:
+                    job.backend.close()
+                except Exception as e:
+                    print(f"Error during cleanup: {str(e)}")
+            self._slots.release()
+
+    @staticmethod
+    def _outcome(job: Job) -> str:
+        """Final status of a job that ran to the end; a job stopped by its
+        deadline is done, with truncated results"""
+        if job.context.cancelled:
+            return "cancelled"
+        if job.context.expired():
+            job.context.truncate("deadline")
+        return "done"
+
+    def _run_batch(self, job: Job) -> list:
+        job.backend = BatchScraper(
+            queries=job.search.queries,
+            pool=self.pool,
+            context=job.context,
+            concurrency=job.search.concurrency,
+            mode=job.search.mode,
+            engine=job.search.engine
+        )
+        locations = []
+        for record, queries in job.backend.run():
+            location = BatchLocation.from_record(record)
+            location.queries = list(queries)
+            locations.append(location)
+        return locations
+
+    def _run_tiled(self, job: Job) -> ScraperResponse:
+        tiling = job.search.tiling
+        if tiling.bbox:
+            area = tuple(tiling.bbox)
+        else:
+            area = bbox_around(tiling.center[0], tiling.center[1], tiling.radius_km)
+        job.backend = TiledScraper(
+            query=job.search.query,
+            tiles=plan_tiles(area, tiling.grid),
+            pool=self.pool,
+            context=job.context,
+            concurrency=job.search.concurrency,
+            mode=job.search.mode,
+            engine=job.search.engine,
+            cap=tiling.cap,
+            max_depth=tiling.max_depth,
+            split=tiling.split
+        )
+        records = [record for record, _ in job.backend.run()]
+        locations = [Location.from_record(item) for item in records] if job.context.retain_records else []
+        status = self._outcome(job)
+        job.result = ScraperResponse(
+            total_results=len(locations) if job.context.retain_records else job.backend.places_parsed,
+            locations=locations,
+            tiles=[TileStats(**stats) for stats in job.backend.tile_stats()],
+            truncated=job.context.truncated is not None,
+            truncated_reason=job.context.truncated,
+            timings=dict(job.context.timings) if job.search.include_timings else None
+        )
+        job.status = status
+        return job.result
+
+    def shutdown(self) -> None:
+        """Stop every queued and running job: running ones give their browsers
+        back at the next cancellation check instead of scraping on"""
+        with self._lock:
+            unfinished = [job for job in self._jobs.values() if not job.finished]
+        for job in unfinished:
+            job.context.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,11 +1,56 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Literal
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from selenium import webdriver
-from scraper.scraper import Backend
-from scraper.common import Common
-from config.setting import ScraperResponse, SearchQuery, Location
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from scraper.pool import DriverPool
+from scraper.enrichment import EmailEnricher
+from scraper.fetch import PlaceFetcher
+from scraper.governor import governor
+from scraper.metrics import metrics
+from scraper.store import PlaceStore
+from scraper.checkpoint import Checkpoint
+from jobs import Job, JobManager, JobQueueFull
+from jobqueue import JobQueue, QueuedJob
+import export
+from config.setting import (
+    ScraperResponse, SearchQuery, JobStatus, Location, BatchQuery, BatchResponse,
+    HEADLESS, DRIVER_POOL_SIZE, DRIVER_LEASE_TIMEOUT,
+    JOB_WORKERS, JOB_QUEUE_SIZE, JOB_HISTORY, STREAM_PROGRESS_INTERVAL
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Launch the shared browsers once instead of per request
+    pool = DriverPool(
+        size=DRIVER_POOL_SIZE,
+        headless=HEADLESS,
+        lease_timeout=DRIVER_LEASE_TIMEOUT
+    )
+    pool.start()
+    app.state.pool = pool
+    app.state.jobs = JobManager(
+        pool=pool,
+        workers=JOB_WORKERS,
+        queue_size=JOB_QUEUE_SIZE,
+        history=JOB_HISTORY,
+        headless=HEADLESS
+    )
+    # With QUEUE_PATH set, /jobs are run by worker processes (see worker.py)
+    app.state.queue = JobQueue.shared()
+    try:
+        yield
+    finally:
+        app.state.jobs.shutdown()
+        JobQueue.close_shared()
+        EmailEnricher.close_shared()
+        PlaceFetcher.close_shared()
+        PlaceStore.close_shared()
+        pool.close()
 
-app = FastAPI(title="Google Maps Scraper API")
+app = FastAPI(title="Google Maps Scraper API", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -21,69 +66,234 @@ async def root():
     return {"message": "Welcome to Google Maps Scraper API"}
 
 @app.post("/scrape", response_model=ScraperResponse)
-async def scrape_google_maps(search: SearchQuery):
-    scraper = None
+async def scrape_google_maps(search: SearchQuery, request: Request):
+    return await wait_for_job(submit_job(search), request)
+
+@app.post("/scrape/batch", response_model=BatchResponse)
+async def scrape_batch(batch: BatchQuery, request: Request):
+    """Scrape several queries as one job; a place listed by more than one
+    query is parsed once and reports every query that matched it"""
+    return await wait_for_job(submit_job(batch), request)
+
+async def wait_for_job(job: Job, request: Request, poll_interval: float = 1.0):
+    finished = asyncio.wrap_future(job.future)
     try:
-        # Initialize scraper in headless mode
-        scraper = Backend(
-            searchquery=search.query,
-            outputformat="json",
-            healdessmode=1
-        )
-        
-        # Run the scraping (remove await since mainscraping is not async)
-        scraper.mainscraping()
-        
-        # Get results from parser with error handling
-        if not scraper.scroller or not scraper.scroller.parser:
-            raise HTTPException(
-                status_code=500,
-                detail="Failed to initialize parser"
-            )
-            
-        results = scraper.scroller.parser.finalData
-        if not results:
-            return ScraperResponse(total_results=0, locations=[])
-        
-        # Format response
-        locations = [
-            Location(
-                category=item.get("Category"),
-                name=item.get("Name"),
-                phone=item.get("Phone"),
-                google_maps_url=item.get("Google Maps URL"),
-                website=item.get("Website"),
-                email=item.get("email"),
-                business_status=item.get("Business Status"),
-                address=item.get("Address"),
-                total_reviews=item.get("Total Reviews"),
-                booking_links=item.get("Booking Links"),
-                rating=item.get("Rating"),
-                hours=item.get("Hours")
-            )
-            for item in results
-        ]
-        
-        return ScraperResponse(
-            total_results=len(locations),
-            locations=locations
-        )
-        
+        # Wait for the worker thread without blocking the event loop, checking
+        # in between that the client is still there: the server does not
+        # cancel a plain request handler when its client disconnects
+        while not finished.done():
+            await asyncio.wait({finished}, timeout=poll_interval)
+            if not finished.done() and await request.is_disconnected():
+                raise asyncio.CancelledError()
+        result = finished.result()
+    except asyncio.CancelledError:
+        # Client went away: stop this job's browser work
+        job.context.cancel()
+        finished.add_done_callback(lambda f: f.cancelled() or f.exception())
+        raise
     except Exception as e:
-        print(f"Error during scraping: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"Scraping failed: {str(e)}"
         )
-        
-    finally:
-        if scraper:
+    if result is None:
+        raise HTTPException(status_code=409, detail="Job was cancelled")
+    return result
+
+@app.post("/scrape/stream")
+async def scrape_stream(search: SearchQuery):
+    """Stream a scrape as NDJSON: one "location" event per place as soon as it
+    is parsed, periodic "progress" events, then a final "done" or "error"."""
+    loop = asyncio.get_running_loop()
+    records = asyncio.Queue()
+    # Checkpointed, so the streamed records can be exported afterwards
+    job = submit_job(
+        search,
+        on_record=lambda item: loop.call_soon_threadsafe(records.put_nowait, item),
+        checkpoint=True
+    )
+    return StreamingResponse(stream_job(job, records), media_type="application/x-ndjson")
+
+async def stream_job(job: Job, records: asyncio.Queue):
+    def event(name: str, **fields) -> str:
+        return json.dumps({"event": name, **fields}) + "\n"
+
+    finished = asyncio.wrap_future(job.future)
+    finished.add_done_callback(lambda f: f.cancelled() or f.exception())  # errors are reported as events
+    last_progress = 0.0
+    try:
+        yield event("started", job_id=job.id)
+        while not (finished.done() and records.empty()):
             try:
-                Common.set_close_thread()
-                if hasattr(scraper, 'driver'):
-                    scraper.driver.quit()
-            except Exception as e:
-                print(f"Error during cleanup: {str(e)}")
+                item = await asyncio.wait_for(records.get(), timeout=STREAM_PROGRESS_INTERVAL)
+                yield event("location", data=Location.from_record(item).model_dump())
+            except asyncio.TimeoutError:
+                pass
+            if loop_time() - last_progress >= STREAM_PROGRESS_INTERVAL:
+                last_progress = loop_time()
+                status = job.to_status()
+                yield event("progress", links_found=status.links_found, places_parsed=status.places_parsed)
+
+        status = job.to_status()
+        if job.status == "failed":
+            yield event("error", detail=f"Scraping failed: {job.error}")
+        else:
+            timings = {"timings": job.context.timings} if job.search.include_timings else {}
+            yield event("done", status=job.status, links_found=status.links_found, total_results=status.places_parsed,
+                        truncated=job.context.truncated is not None, truncated_reason=job.context.truncated,
+                        **timings)
+    finally:
+        # Client disconnected (or stream ended): make sure the job stops
+        job.context.cancel()
+
+def loop_time() -> float:
+    return asyncio.get_running_loop().time()
+
+@app.post("/jobs", response_model=JobStatus, status_code=202)
+async def create_job(search: SearchQuery):
+    if app.state.queue:
+        try:
+            return app.state.queue.put(search).to_status()
+        except JobQueueFull as e:
+            raise HTTPException(status_code=429, detail=str(e))
+    return submit_job(search, checkpoint=True).to_status()
+
+@app.post("/jobs/{job_id}/resume", response_model=JobStatus, status_code=202)
+async def resume_job(job_id: str):
+    """Restart an interrupted job from its checkpoint, keeping its id"""
+    if app.state.queue and app.state.queue.get(job_id):
+        return app.state.queue.resume(job_id).to_status()
+    try:
+        job = app.state.jobs.resume(job_id)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    if not job:
+        raise HTTPException(status_code=404, detail="No checkpoint for this job")
+    return job.to_status()
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    return find_job(job_id).to_status()
+
+@app.delete("/jobs/{job_id}", response_model=JobStatus)
+async def cancel_job(job_id: str):
+    if isinstance(find_job(job_id), QueuedJob):
+        return app.state.queue.cancel(job_id).to_status()
+    return app.state.jobs.cancel(job_id).to_status()
+
+@app.get("/jobs/{job_id}/results", response_model=ScraperResponse)
+async def get_job_results(job_id: str):
+    job = find_job(job_id)
+    if job.status == "cancelled" and job.result:
+        return job.result
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=f"Scraping failed: {job.error}")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return job.result
+
+@app.get("/jobs/{job_id}/export")
+async def export_job_results(job_id: str, format: Literal["csv", "jsonl", "parquet"] = "csv"):
+    """Download a job's locations, streamed one record at a time from its
+    checkpoint log (or its in-memory result when it has no checkpoint)"""
+    if format == "parquet" and export.pyarrow is None:
+        raise HTTPException(status_code=501, detail="Parquet export needs pyarrow installed on the server")
+    job = app.state.jobs.get(job_id) or (app.state.queue and app.state.queue.get(job_id))
+    batch = False
+    if job is None:
+        # Forgotten, e.g. after a restart, but still on disk
+        if not Checkpoint.exists(job_id):
+            raise HTTPException(status_code=404, detail="Job not found")
+        records = Checkpoint(job_id).iter_records()
+    elif job.status == "failed":
+        raise HTTPException(status_code=500, detail=f"Scraping failed: {job.error}")
+    elif job.status not in ("done", "cancelled"):
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    elif job.checkpoint:
+        records = job.checkpoint.iter_records()
+    else:
+        records = job.result.locations if job.result else []
+        batch = isinstance(job.search, BatchQuery)
+    return StreamingResponse(
+        export.stream(records, format, batch=batch),
+        media_type=export.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="google_maps_{job_id}.{format}"'}
+    )
+
+@app.get("/workers")
+async def list_workers():
+    """Queued jobs by status and the workers seen recently, with whether
+    each still checks in"""
+    queue = app.state.queue
+    if not queue:
+        return {"enabled": False}
+    return {"enabled": True, "queue": queue.counts(), "workers": queue.workers()}
+
+@app.get("/cache/emails")
+async def email_cache_stats():
+    cache = EmailEnricher.shared().cache
+    if not cache:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Stage timings and counters in the Prometheus text format"""
+    pool = app.state.pool.stats()
+    gauges = {
+        ("driver_pool_browsers", "Pooled browsers by state"): {
+            (("state", "idle"),): pool["idle"],
+            (("state", "leased"),): pool["leased"],
+        },
+        ("jobs", "Remembered jobs by status"): {
+            (("status", status),): count for status, count in app.state.jobs.counts().items()
+        },
+    }
+    if app.state.queue:
+        gauges[("queue_jobs", "Jobs in the durable job queue by status")] = {
+            (("status", status),): count for status, count in app.state.queue.counts().items()
+        }
+        gauges[("queue_workers_alive", "Workers that checked in with the job queue recently")] = sum(
+            worker["alive"] for worker in app.state.queue.workers()
+        )
+    browsers = governor.stats()
+    gauges[("browser_rss_bytes", "Resident memory of the pooled browsers' process trees")] = browsers["rss_bytes"]
+    gauges[("browser_pages", "Pages opened by the pooled browsers since they were last recycled")] = browsers["pages"]
+    cache = EmailEnricher.shared().cache
+    if cache:
+        stats = cache.stats()
+        gauges[("email_cache_entries", "Websites in the email cache")] = stats["entries"]
+        gauges[("email_cache_requests", "Email cache lookups since start")] = {
+            (("result", "hit"),): stats["hits"],
+            (("result", "miss"),): stats["misses"],
+        }
+    store = PlaceStore.shared()
+    if store:
+        stats = store.stats()
+        gauges[("place_store_entries", "Places in the place store")] = stats["entries"]
+    return PlainTextResponse(metrics.render(gauges), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/places")
+async def place_store_stats():
+    store = PlaceStore.shared()
+    if not store:
+        return {"enabled": False}
+    return {"enabled": True, **store.stats()}
+
+def submit_job(search, on_record=None, checkpoint: bool = False) -> Job:
+    try:
+        return app.state.jobs.submit(search, on_record=on_record, checkpoint=checkpoint)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+def find_job(job_id: str):
+    """The in-process Job, or the QueuedJob when workers run it"""
+    job = app.state.jobs.get(job_id)
+    if not job and app.state.queue:
+        job = app.state.queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 if __name__ == "__main__":
     import uvicorn
@@ -92,5 +302,3 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
     )
-
-
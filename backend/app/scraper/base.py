@@ -1,36 +1,55 @@
 from selenium.webdriver.support.ui import WebDriverWait
-from time import sleep
 from selenium.webdriver.support import expected_conditions as Ec
 from selenium.common.exceptions import (
     WebDriverException
 )
-from .common import Common
+from scraper.governor import governor
+from scraper.metrics import metrics
+from scraper.resources import profile
 
 
 class Base:
+    """Shared navigation helpers; subclasses set ``driver`` and ``context``"""
+
     timeout = 120
 
-    def openingurl(self, url: str):
+    def openingurl(self, url: str, stage: str = "detail") -> bool:
         """
-        To avoid internet connection error while requesting"""
+        To avoid internet connection error while requesting.
+        ``stage`` ("scroll" or "detail") picks how long the resource profile
+        waits for the page to load.
+        Returns False when the job was cancelled before the page opened and
+        re-raises the WebDriverException once ``context.max_retries`` is used up."""
 
+        failures = 0
         while True:
-            if Common.close_thread_is_set():
-                self.driver.quit()
-                return
+            if self.context.is_cancelled():
+                return False
 
             try:
-                self.driver.get(url)
+                # A browser past its page or memory budget is swapped out first
+                governor.navigating(self.driver)
+                with metrics.timer("navigation", self.context):
+                    self.driver.get(url)
             except WebDriverException:
-                sleep(5)
+                failures += 1
+                if self.context.max_retries is not None and failures > self.context.max_retries:
+                    metrics.inc("navigation_failures_total")
+                    raise
+                metrics.inc("navigation_retries_total")
+                if self.context.wait(5):
+                    return False
                 continue
             else:
-                break
+                profile.wait_loaded(self.driver, stage, self.context)
+                profile.record_page(self.driver, stage)
+                return True
 
     def findelementwithwait(self, by, value):
         """we will use this function to find an element"""
 
-        element = WebDriverWait(self.driver, self.timeout).until(
-            Ec.visibility_of_element_located((by, value))
-        )
-        return element
\ No newline at end of file
+        with metrics.timer("element_wait", self.context):
+            element = WebDriverWait(self.driver, self.context.remaining(self.timeout)).until(
+                Ec.visibility_of_element_located((by, value))
+            )
+        return element
@@ -0,0 +1,167 @@
+import queue
+import threading
+from scraper.base import Base
+from scraper.common import JobContext
+from scraper.feed import place_id
+from scraper.metrics import metrics
+from scraper.parser import Parser
+from scraper.scroller import Scroller
+from scraper.scraper import search_url
+
+
+class _FeedOpener(Base):
+    def __init__(self, driver, context: JobContext) -> None:
+        self.driver = driver
+        self.context = context
+
+
+class BatchScraper:
+    """Runs many related queries as one job and opens each place page once.
+
+    Up to ``concurrency`` pooled browsers scroll the queries' result feeds
+    in parallel. Every card is keyed by ``place_id`` in one seen-set shared
+    by all queries, so a place listed by several queries is kept once along
+    with the queries that matched it. The unique places are then parsed like
+    a single query's results, with ``mode`` and ``engine`` as in Backend.
+    """
+
+    def __init__(self, queries: list, pool, context: JobContext = None, concurrency: int = 1,
+                 mode: str = "full", engine: str = "script") -> None:
+        # Repeated queries would only re-scroll the same feed
+        self.queries = list(dict.fromkeys(query.strip() for query in queries if query.strip()))
+        self.pool = pool
+        self.context = context or JobContext()
+        self.concurrency = concurrency
+        self.mode = mode
+        self.engine = engine
+        self.places = {}  # place id -> {"card": first card seen, "queries": [...]}
+        self.stats = {query: {"query": query, "links_found": 0, "new_places": 0} for query in self.queries}
+        self.parser = None
+        self.drivers = []
+        self._lock = threading.Lock()
+
+    @property
+    def links_found(self) -> int:
+        """Unique places found so far across all queries"""
+        with self._lock:
+            return len(self.places)
+
+    @property
+    def places_parsed(self) -> int:
+        return self.parser.parsedCount if self.parser else 0
+
+    def run(self) -> list:
+        """Scroll every query, then parse each unique place once.
+        Returns ``(record, queries)`` pairs in the order places were found"""
+        work = queue.Queue()
+        items = self.searches()
+        for item in items:
+            work.put(item)
+
+        with metrics.timer("driver_acquire", self.context):
+            self.drivers = [self.pool.acquire()]
+        while len(self.drivers) < min(self.concurrency, len(items)):
+            driver = self.pool.try_acquire()
+            if not driver:
+                break
+            self.drivers.append(driver)
+
+        threads = [
+            threading.Thread(target=self._scroll_worker, args=(driver, work), daemon=True, name="batch-scroll")
+            for driver in self.drivers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Hand the extra browsers back; parsing borrows whatever is idle
+        for driver in self.drivers[1:]:
+            self.pool.release(driver)
+        self.drivers = self.drivers[:1]
+
+        if self.context.cancelled:
+            return []
+        return self._parse()
+
+    def searches(self) -> list:
+        """The ``(label, url, payload)`` feeds to scroll; labels name the
+        search in each place's ``queries`` and in the stats"""
+        return [(query, search_url(query), None) for query in self.queries]
+
+    def scrolled(self, label: str, payload, cards: list, work: queue.Queue) -> None:
+        """Called after each feed is merged; may queue further searches"""
+
+    def _scroll_worker(self, driver, work: queue.Queue) -> None:
+        opener = _FeedOpener(driver, self.context)
+        while not self.context.is_cancelled():
+            try:
+                label, url, payload = work.get(timeout=0.2)
+            except queue.Empty:
+                # Searches still being scrolled may queue follow-up ones
+                if not work.unfinished_tasks:
+                    return
+                continue
+            try:
+                if self._full():
+                    print(f"Reached max_results ({self.context.max_results}), skipping {label!r}")
+                    self.context.truncate("max_results")
+                    continue
+                if not opener.openingurl(url=url, stage="scroll"):
+                    return
+                scroller = Scroller(driver, self.context, mode="feed")
+                scroller.scroll_feed()
+                self.merge(label, scroller.cards)
+                self.scrolled(label, payload, scroller.cards, work)
+            except Exception as e:
+                print(f"Error scrolling results for {label!r}: {str(e)}")
+            finally:
+                work.task_done()
+
+    def _full(self) -> bool:
+        limit = self.context.max_results
+        with self._lock:
+            return bool(limit) and len(self.places) >= limit
+
+    def merge(self, query: str, cards: list) -> None:
+        limit = self.context.max_results
+        with self._lock:
+            stats = self.stats.setdefault(query, {"query": query, "links_found": 0, "new_places": 0})
+            stats["links_found"] = len(cards)
+            for card in cards:
+                key = place_id(card["Google Maps URL"])
+                place = self.places.get(key)
+                if place is None and limit and len(self.places) >= limit:
+                    self.context.truncate("max_results")
+                elif place is None:
+                    self.places[key] = {"card": card, "queries": [query]}
+                    stats["new_places"] += 1
+                elif query not in place["queries"]:
+                    place["queries"].append(query)
+            unique = len(self.places)
+        print(f"Batch query {query!r}: {len(cards)} places, {stats['new_places']} new ({unique} unique so far)")
+
+    def _parse(self) -> list:
+        with self._lock:
+            places = list(self.places.values())
+        self.parser = Parser(self.drivers[0], self.context, pool=self.pool, engine=self.engine)
+        if not places:
+            print("No results links found to parse")
+            return []
+
+        cards = [place["card"] for place in places]
+        if self.mode in ("feed", "hybrid"):
+            records = self.parser.from_feed(cards, hybrid=self.mode == "hybrid", concurrency=self.concurrency)
+        else:
+            records = self.parser.main([card["Google Maps URL"] for card in cards], concurrency=self.concurrency)
+        return [(record, place["queries"]) for record, place in zip(records, places) if record]
+
+    def query_stats(self) -> list:
+        with self._lock:
+            return [dict(stats) for stats in self.stats.values()]
+
+    def close(self) -> None:
+        """Return every held driver to the pool"""
+        for driver in self.drivers:
+            self.pool.release(driver)
+        self.drivers = []
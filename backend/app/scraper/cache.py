@@ -0,0 +1,93 @@
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class EmailCache:
+    """SQLite cache of website email lookups keyed by normalized website:
+    origin plus path, since hosted pages such as example.com/biz1/ and
+    example.com/biz2/ belong to different places.
+
+    Negative results (no email found) are cached too. Entries expire after
+    ``ttl`` seconds and the least recently used ones are evicted once the
+    cache holds more than ``max_entries`` websites.
+    """
+
+    def __init__(self, path: str, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS email_cache ("
+            " origin TEXT PRIMARY KEY,"  # the normalized website, see normalize()
+            " emails TEXT,"
+            " fetched_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS email_cache_accessed ON email_cache (accessed_at)")
+        self._db.commit()
+
+    @staticmethod
+    def normalize(url: str) -> str:
+        """Reduce a website URL to ``scheme://host[:port]/path`` without
+        ``www.``, the query, the fragment or a trailing slash"""
+        parts = urlsplit(url if "://" in url else f"http://{url}")
+        host = (parts.hostname or "").lower()
+        if host.startswith("www."):
+            host = host[4:]
+        port = parts.port
+        if port and (parts.scheme, port) not in (("http", 80), ("https", 443)):
+            host = f"{host}:{port}"
+        return f"{parts.scheme.lower()}://{host}{parts.path.rstrip('/')}"
+
+    def get(self, url: str):
+        """Return ``(hit, emails)``; ``emails`` may be None for a cached miss"""
+        origin = self.normalize(url)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT emails, fetched_at FROM email_cache WHERE origin = ?", (origin,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return False, None
+            self._db.execute("UPDATE email_cache SET accessed_at = ? WHERE origin = ?", (now, origin))
+            self._db.commit()
+            self.hits += 1
+            return True, row[0]
+
+    def put(self, url: str, emails) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO email_cache (origin, emails, fetched_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (self.normalize(url), emails, now, now)
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        self._db.execute("DELETE FROM email_cache WHERE fetched_at < ?", (time.time() - self.ttl,))
+        size = self._db.execute("SELECT COUNT(*) FROM email_cache").fetchone()[0]
+        if size > self.max_entries:
+            self._db.execute(
+                "DELETE FROM email_cache WHERE origin IN ("
+                " SELECT origin FROM email_cache ORDER BY accessed_at LIMIT ?)",
+                (size - self.max_entries,)
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._db.execute("SELECT COUNT(*) FROM email_cache").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": size}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,130 @@
+import json
+import os
+import re
+import shutil
+import threading
+from scraper.feed import place_id
+from config.setting import CHECKPOINT_DIR
+
+# Job ids are uuid4 hex strings; anything else never names a directory
+JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+
+class Checkpoint:
+    """On-disk progress of one job, so it can be resumed after a crash.
+
+    Everything lives in ``CHECKPOINT_DIR/<job_id>/``:
+    - ``search.json``: the request, to restart the job from
+    - ``cards.jsonl``: every result card as the feed is scrolled, then
+      ``{"end": true}`` once the link list is complete
+    - ``records.jsonl``: each finished record with its place id
+      (``scraper.feed.place_id``), appended as it is emitted
+
+    Each line is flushed and fsynced when written, and a line torn by a
+    crash is ignored when the files are read back. A resumed job skips the
+    scroll when the link list is complete and every place already in the
+    record log.
+    """
+
+    def __init__(self, job_id: str, directory: str = CHECKPOINT_DIR) -> None:
+        self.job_id = job_id
+        self.path = os.path.join(directory, job_id)
+        os.makedirs(self.path, exist_ok=True)
+        self._lock = threading.Lock()
+        cards = list(self._read("cards.jsonl"))
+        self.scrolled = bool(cards) and cards[-1].get("end") is True
+        self.done = {line["place"] for line in self._read("records.jsonl") if "place" in line}
+
+    @classmethod
+    def exists(cls, job_id: str, directory: str = CHECKPOINT_DIR) -> bool:
+        if not directory or not JOB_ID.fullmatch(job_id):
+            return False
+        return os.path.isfile(os.path.join(directory, job_id, "search.json"))
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _read(self, name: str):
+        try:
+            with open(self._file(name), encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+        except FileNotFoundError:
+            return
+
+    def _append(self, name: str, lines: list) -> None:
+        with self._lock:
+            with open(self._file(name), "a", encoding="utf-8") as handle:
+                handle.writelines(json.dumps(line) + "\n" for line in lines)
+                handle.flush()
+                os.fsync(handle.fileno())
+
+    def save_search(self, search: str) -> None:
+        """Write the request JSON, unless it was saved by an earlier run"""
+        if not os.path.exists(self._file("search.json")):
+            with open(self._file("search.json"), "w", encoding="utf-8") as handle:
+                handle.write(search)
+
+    def load_search(self) -> str:
+        with open(self._file("search.json"), encoding="utf-8") as handle:
+            return handle.read()
+
+    def restart_scroll(self) -> None:
+        """Drop the cards of a scroll that never finished; it is redone"""
+        with self._lock:
+            open(self._file("cards.jsonl"), "w").close()
+            self.scrolled = False
+
+    def add_cards(self, cards: list) -> None:
+        if cards:
+            self._append("cards.jsonl", cards)
+
+    def end_scroll(self) -> None:
+        self._append("cards.jsonl", [{"end": True}])
+        self.scrolled = True
+
+    def cards(self) -> list:
+        return [card for card in self._read("cards.jsonl") if "Google Maps URL" in card]
+
+    def add_record(self, place: str, record: dict) -> None:
+        if place in self.done:
+            return
+        self._append("records.jsonl", [{"place": place, "record": record}])
+        self.done.add(place)
+
+    def records(self) -> list:
+        """The logged records, in feed order when the feed was checkpointed"""
+        return list(self.iter_records())
+
+    def iter_records(self):
+        """Yield the logged records in feed order while holding only their
+        file offsets, so an export of any size reads one record at a time"""
+        order = {}
+        for card in self._read("cards.jsonl"):
+            if "Google Maps URL" in card:
+                order.setdefault(place_id(card["Google Maps URL"]), len(order))
+        try:
+            handle = open(self._file("records.jsonl"), "rb")
+        except FileNotFoundError:
+            return
+        with handle:
+            offsets = []
+            offset = 0
+            for line in iter(handle.readline, b""):
+                try:
+                    place = json.loads(line).get("place")
+                except ValueError:
+                    place = None
+                if place is not None:
+                    offsets.append((order.get(place, len(order)), offset))
+                offset += len(line)
+            offsets.sort()
+            for _, offset in offsets:
+                handle.seek(offset)
+                yield json.loads(handle.readline())["record"]
+
+    def remove(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
@@ -1,15 +1,77 @@
 import threading
+import time
 
-class Common:
-    closeThread = threading.Event()
-    lock = threading.Lock()
 
-    @classmethod
-    def set_close_thread(cls):
-        with cls.lock:
-            cls.closeThread.set()
+class JobContext:
+    """Cancellation and deadline state for a single scraping job.
 
-    @classmethod
-    def close_thread_is_set(cls):
-        return cls.closeThread.is_set()
-    
\ No newline at end of file
+    Every Base/Scroller/Parser of a job shares one context, so cancelling a
+    job (or running past its deadline) stops only that job's work. It also
+    carries the job's per-request switches (e.g. ``refresh_emails``) and an
+    optional ``on_record`` callback that receives each finished record;
+    streaming jobs set ``retain_records=False`` so records are not kept.
+    ``timings`` sums the job's stage durations (see scraper.metrics).
+    A ``checkpoint`` (scraper.checkpoint) records the job's progress on disk.
+
+    Budgets: ``max_results`` caps the places taken from the feed and
+    ``max_retries`` the navigation retries per page. Places stored less than
+    ``max_age`` seconds ago are not scraped again. ``truncated`` names the
+    first budget that cut the job short ("max_results" or "deadline").
+    """
+
+    def __init__(self, deadline_seconds: float = None, refresh_emails: bool = False,
+                 on_record=None, retain_records: bool = True, max_results: int = None,
+                 max_retries: int = None, max_age: float = None, checkpoint=None) -> None:
+        self.refresh_emails = refresh_emails
+        self.max_age = max_age
+        self.max_results = max_results
+        self.max_retries = max_retries
+        self.truncated = None
+        self.on_record = on_record
+        self.retain_records = retain_records
+        self.checkpoint = checkpoint
+        self._cancelled = threading.Event()
+        self.deadline = time.monotonic() + deadline_seconds if deadline_seconds else None
+        self.timings = {}
+        self._timings_lock = threading.Lock()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """True only for an explicit cancel, not for an expired deadline"""
+        return self._cancelled.is_set()
+
+    def set_deadline(self, seconds: float) -> None:
+        """Start the deadline clock, e.g. once a queued job starts running"""
+        self.deadline = time.monotonic() + seconds if seconds else None
+
+    def truncate(self, reason: str) -> None:
+        if self.truncated is None:
+            self.truncated = reason
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled.is_set() or self.expired()
+
+    def remaining(self, default: float = None) -> float:
+        """Seconds left before the deadline, capped at ``default``"""
+        if self.deadline is None:
+            return default
+        left = max(0.0, self.deadline - time.monotonic())
+        return min(left, default) if default is not None else left
+
+    def wait(self, seconds: float) -> bool:
+        """Sleep up to ``seconds``, waking early on cancellation.
+        Returns True when the job has been cancelled."""
+        self._cancelled.wait(self.remaining(seconds))
+        return self.is_cancelled()
+
+    def add_timing(self, stage: str, seconds: float) -> None:
+        with self._timings_lock:
+            timing = self.timings.setdefault(stage, {"count": 0, "seconds": 0.0})
+            timing["count"] += 1
+            timing["seconds"] += seconds
@@ -0,0 +1,128 @@
+import html
+import re
+from urllib.parse import urljoin, urlsplit, unquote
+
+# Local part bounded so a long base64 or minified run cannot make every
+# position a candidate start; the TLD must not run on into a word
+EMAIL = re.compile(
+    r"(?<![\w.%+-])[a-z0-9](?:[a-z0-9._%+-]{0,62}[a-z0-9_%+-])?"
+    r"@(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z]{2,24}(?![\w-])",
+    re.I
+)
+# Matched just before / after each "mailto:", found with str.find: a
+# case-insensitive regex scan of a large page costs far more
+MAILTO_HREF = re.compile(r"""href\s*=\s*["']?\s*$""")
+MAILTO_ADDRESS = re.compile(r"""[^"'>\s?]+""")
+LD_JSON = re.compile(r"""<script[^>]*application/ld\+json[^>]*>(.*?)</script\s*>""", re.I | re.S)
+LD_EMAIL = re.compile(r""""email"\s*:\s*"(?:mailto:)?([^"]+)\"""", re.I)
+# Elements whose content is never shown: scripts (with inline data), styles,
+# comments and inline SVG
+HIDDEN = re.compile(
+    r"<(script|style|noscript|template|svg)\b[^>]*>.*?</\1\s*>|<!--.*?-->",
+    re.I | re.S
+)
+TAG = re.compile(r"<[^>]*>")
+ANCHOR = re.compile(r"<a\b([^>]*)>(.*?)</a\s*>", re.I | re.S)
+HREF = re.compile(r"""\bhref\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.I)
+
+# "name@2x.png" and the like: image, font and script names that look like
+# addresses, by their "TLD"
+ASSET_SUFFIXES = {
+    "png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp", "tif", "tiff",
+    "css", "js", "mjs", "map", "json", "xml", "html", "htm", "php",
+    "woff", "woff2", "ttf", "otf", "eot", "mp4", "webm", "mp3", "pdf", "zip",
+}
+# Placeholders and error-reporting endpoints found on many sites
+IGNORED_DOMAINS = {
+    "example.com", "example.org", "example.net", "domain.com", "yourdomain.com",
+    "sentry.io", "wixpress.com", "sentry-next.wixpress.com",
+}
+HASH = re.compile(r"[0-9a-f]{16,}")
+# Pages likely to list an email, by what their link path or text says;
+# lower ranks are read first
+CONTACT_PAGES = [
+    (0, re.compile(r"contact|kontakt|contacto|contatti|get-in-touch|reach-us", re.I)),
+    (1, re.compile(r"impressum|imprint|legal-notice", re.I)),
+    (2, re.compile(r"about|team|company|support", re.I)),
+]
+SKIPPED_LINKS = re.compile(r"\.(?:pdf|jpe?g|png|gif|webp|svg|zip|docx?|xlsx?)$", re.I)
+
+
+def plausible(email: str) -> bool:
+    """False for asset names, placeholders and hashes that match EMAIL"""
+    local, _, domain = email.lower().rpartition("@")
+    if domain.rsplit(".", 1)[-1] in ASSET_SUFFIXES:
+        return False
+    if domain in IGNORED_DOMAINS or any(domain.endswith("." + ignored) for ignored in IGNORED_DOMAINS):
+        return False
+    return not HASH.fullmatch(local)
+
+
+def _add(found: dict, candidates) -> None:
+    for candidate in candidates:
+        candidate = candidate.strip().strip(".")
+        if EMAIL.fullmatch(candidate) and plausible(candidate):
+            found.setdefault(candidate.lower(), candidate)
+
+
+def _mailto(page: str):
+    """Addresses of the ``mailto:`` links on ``page``, still URL-encoded"""
+    lowered = page.lower()
+    start = lowered.find("mailto:")
+    while start != -1:
+        if MAILTO_HREF.search(lowered, max(0, start - 16), start):
+            address = MAILTO_ADDRESS.match(page, start + len("mailto:"))
+            if address:
+                yield address.group()
+        start = lowered.find("mailto:", start + 1)
+
+
+def emails_in(page: str) -> list:
+    """Addresses on an HTML page, most trustworthy first: ``mailto:`` links,
+    then visible text, then schema.org ``email`` fields. Other script and
+    style bodies are never searched."""
+    found = {}
+    # No "@", and none hidden behind an entity or in an escaped mailto link
+    if "@" not in page and "&#" not in page and "&commat;" not in page and "%40" not in page:
+        return []
+    for address in _mailto(page):
+        _add(found, unquote(html.unescape(address)).split(","))
+    text = html.unescape(TAG.sub(" ", HIDDEN.sub(" ", page)))
+    _add(found, EMAIL.findall(text))
+    if not found:
+        for block in LD_JSON.findall(page):
+            _add(found, LD_EMAIL.findall(block))
+    return list(found.values())
+
+
+def _site(url: str) -> str:
+    host = urlsplit(url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def contact_links(page: str, base_url: str, limit: int = 3) -> list:
+    """Up to ``limit`` same-site links from ``page`` to contact, imprint or
+    about pages, contact pages first and otherwise in page order"""
+    site = _site(base_url)
+    here = urlsplit(base_url)
+    seen = {(here.path or "/", here.query)}
+    ranked = {}
+    for position, match in enumerate(ANCHOR.finditer(page)):
+        href = HREF.search(match.group(1))
+        if not href:
+            continue
+        target = html.unescape(next(group for group in href.groups() if group is not None)).strip()
+        url = urljoin(base_url, target).split("#")[0]
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or _site(url) != site or SKIPPED_LINKS.search(parts.path):
+            continue
+        # With or without "www." and a fragment, it is the same page
+        key = (parts.path or "/", parts.query)
+        if key in seen:
+            continue
+        seen.add(key)
+        label = f"{unquote(parts.path)} {TAG.sub(' ', match.group(2))}"
+        rank = next((rank for rank, words in CONTACT_PAGES if words.search(label)), None)
+        if rank is not None:
+            ranked[url] = (rank, position)
+    return sorted(ranked, key=ranked.get)[:limit]
@@ -0,0 +1,265 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from scraper.common import JobContext
+from scraper.cache import EmailCache
+from scraper.emails import emails_in, contact_links
+from scraper.metrics import metrics
+from config.setting import (
+    EMAIL_WORKERS, EMAIL_PER_HOST, EMAIL_MAX_BYTES, EMAIL_TIMEOUT, EMAIL_MAX_PAGES,
+    EMAIL_CACHE_PATH, EMAIL_CACHE_TTL, EMAIL_CACHE_MAX_ENTRIES
+)
+
+
+class EmailEnricher:
+    """Looks up emails on business websites in the background.
+
+    Lookups run on a shared thread pool (the global concurrency limit) over one
+    keep-alive ``requests.Session``. At most ``per_host`` lookups of one host
+    are handed to the pool at a time; the rest wait in a queue of their own,
+    so a single slow site holds no worker that other sites could use.
+    Responses are cut off at ``max_bytes``.
+    When the homepage lists no address, up to ``max_pages`` of the contact,
+    imprint or about pages it links to are read (see scraper.emails).
+    Results are memoized per website in an optional EmailCache, and
+    concurrent lookups of one website share the crawl of the first.
+    """
+
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36"
+    }
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_workers: int = 16, per_host: int = 2, max_bytes: int = 1_000_000, timeout: float = 10,
+                 max_pages: int = 3, cache: EmailCache = None):
+        self.cache = cache
+        self.per_host = per_host
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="email")
+        # Per host: lookups waiting for a slot, and how many are in the pool
+        self._queued = {}
+        self._running = {}
+        self._hosts_lock = threading.Lock()
+        # Website -> Future of the crawl in progress, as (finished, emails)
+        self._lookups = {}
+        self._lookups_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> "EmailEnricher":
+        """The process-wide enricher, created on first use"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(
+                    max_workers=EMAIL_WORKERS,
+                    per_host=EMAIL_PER_HOST,
+                    max_bytes=EMAIL_MAX_BYTES,
+                    timeout=EMAIL_TIMEOUT,
+                    max_pages=EMAIL_MAX_PAGES,
+                    cache=EmailCache(
+                        EMAIL_CACHE_PATH,
+                        ttl=EMAIL_CACHE_TTL,
+                        max_entries=EMAIL_CACHE_MAX_ENTRIES
+                    ) if EMAIL_CACHE_PATH else None
+                )
+            return cls._shared
+
+    @classmethod
+    def close_shared(cls) -> None:
+        with cls._shared_lock:
+            if cls._shared is not None:
+                cls._shared.close()
+                cls._shared = None
+
+    def submit(self, record: dict, context: JobContext, then=None) -> Future:
+        """Schedule an email lookup that fills ``record["email"]`` in place and
+        then calls ``then(record)``; both are done when the future completes"""
+        future = Future()
+        if then:
+            # A lookup dropped by wait() still hands its record on, without email
+            future.add_done_callback(lambda f: f.cancelled() and then(record))
+        host = urlsplit(record.get("Website") or "").netloc.lower()
+        with self._hosts_lock:
+            self._queued.setdefault(host, deque()).append((future, record, context, then))
+        self._dispatch(host)
+        return future
+
+    def _dispatch(self, host: str) -> None:
+        """Hand queued lookups of ``host`` to the pool while it has a free slot"""
+        while True:
+            with self._hosts_lock:
+                queued = self._queued.get(host)
+                while queued and queued[0][0].cancelled():
+                    queued.popleft()
+                if not queued:
+                    self._queued.pop(host, None)
+                    return
+                if self._running.get(host, 0) >= self.per_host:
+                    return
+                lookup = queued.popleft()
+                self._running[host] = self._running.get(host, 0) + 1
+            future = lookup[0]
+            try:
+                task = self.executor.submit(self._run, host, *lookup)
+            except RuntimeError:
+                # The enricher was closed
+                future.cancel()
+                self._release(host, dispatch=False)
+                continue
+            # Dropped by close() before it started
+            task.add_done_callback(lambda task, future=future: task.cancelled() and (
+                future.cancel(), self._release(host)
+            ))
+
+    def _run(self, host: str, future: Future, record: dict, context: JobContext, then=None) -> None:
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    self._enrich(record, context, then)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(None)
+        finally:
+            self._release(host)
+
+    def _release(self, host: str, dispatch: bool = True) -> None:
+        with self._hosts_lock:
+            self._running[host] -= 1
+            if not self._running[host]:
+                del self._running[host]
+        if dispatch:
+            self._dispatch(host)
+
+    def _enrich(self, record: dict, context: JobContext, then=None) -> None:
+        try:
+            record["email"] = self.find_mail(record.get("Website"), context)
+        finally:
+            if then:
+                then(record)
+
+    def wait(self, futures: list, context: JobContext) -> None:
+        """Block until ``futures`` finish, dropping the rest on cancellation"""
+        pending = set(futures)
+        while pending and not context.is_cancelled():
+            _, pending = wait(pending, timeout=context.remaining(1.0))
+        for future in pending:
+            future.cancel()
+
+    def fetch(self, url: str, context: JobContext) -> tuple:
+        """GET ``url``; returns the URL it ended up at (after redirects) and at
+        most ``max_bytes`` of its body as text, empty for non-HTML responses"""
+        if context.is_cancelled():
+            return url, ""
+        with metrics.timer("email_fetch", context), \
+                self.session.get(url, timeout=context.remaining(self.timeout), stream=True) as response:
+            content_type = response.headers.get("Content-Type", "text/html").lower()
+            if "html" not in content_type and "text" not in content_type:
+                # Images, PDFs and downloads are not read
+                return response.url, ""
+            body = bytearray()
+            for chunk in response.iter_content(chunk_size=16384):
+                body += chunk
+                if len(body) >= self.max_bytes:
+                    del body[self.max_bytes:]
+                    break
+            return response.url, body.decode(response.encoding or "utf-8", errors="replace")
+
+    def find_mail(self, url, context: JobContext):
+        if not url or context.is_cancelled():
+            return None
+
+        if self.cache and not context.refresh_emails:
+            hit, emails = self.cache.get(url)
+            if hit:
+                metrics.inc("email_lookups_total", result="cached")
+                return emails
+
+        # Keyed like the cache, so both agree on what counts as one website
+        site = EmailCache.normalize(url)
+        with self._lookups_lock:
+            lookup = self._lookups.get(site)
+            leader = lookup is None
+            if leader:
+                lookup = self._lookups[site] = Future()
+        if not leader:
+            # Another lookup is reading this site right now: use its result
+            while not lookup.done():
+                if context.is_cancelled():
+                    return None
+                wait([lookup], timeout=context.remaining(1.0))
+            finished, emails = lookup.result()
+            if not finished:
+                # It was cancelled part way through
+                return self.find_mail(url, context)
+            metrics.inc("email_lookups_total", result="shared")
+            return emails
+
+        emails = None
+        try:
+            emails = self._lookup(url, context)
+        finally:
+            with self._lookups_lock:
+                del self._lookups[site]
+            lookup.set_result((not context.is_cancelled(), emails))
+        return emails
+
+    def _lookup(self, url, context: JobContext):
+        try:
+            with metrics.timer("email_lookup", context):
+                emails = self._crawl(url, context)
+        except Exception as e:
+            # Errors are not cached so the site is retried next time
+            metrics.inc("email_lookups_total", result="error")
+            print(f"Error finding email: {str(e)}")
+            return None
+
+        metrics.inc("email_lookups_total", result="crawled")
+
+        if self.cache and not context.is_cancelled():
+            self.cache.put(url, emails)
+        return emails
+
+    def _crawl(self, url, context: JobContext):
+        home, page = self.fetch(url, context)
+        with metrics.timer("email_extract", context):
+            emails = emails_in(page)
+            pages = [] if emails else contact_links(page, home, self.max_pages)
+        if not emails and not pages:
+            # The homepage links nowhere useful; guess the usual paths
+            pages = [f"{url.rstrip('/')}/contact", f"{url.rstrip('/')}/contact-us"][:self.max_pages]
+
+        for contact_url in pages:
+            if context.is_cancelled():
+                break
+            try:
+                _, page = self.fetch(contact_url, context)
+            except requests.RequestException:
+                continue
+            with metrics.timer("email_extract", context):
+                emails = emails_in(page)
+            if emails:
+                break
+
+        return ", ".join(emails) if emails else None
+
+    def close(self) -> None:
+        with self._hosts_lock:
+            queued = [lookup[0] for lookups in self._queued.values() for lookup in lookups]
+            self._queued.clear()
+        for future in queued:
+            future.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+        if self.cache:
+            self.cache.close()
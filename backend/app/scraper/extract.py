@@ -0,0 +1,232 @@
+import json
+import re
+from urllib.parse import urlsplit, parse_qs
+from bs4 import BeautifulSoup
+from scraper.feed import empty_record
+
+comparing_tool_tips = {
+    "location": "Copy address",
+    "phone": "Copy phone number",
+    "website": "Open website",
+    "booking": "Open booking link",
+}
+
+# Reads every field parse_place_html looks for inside [role='main'] and
+# returns them as one small object, so a place page costs a single round-trip.
+# Text is normalized the way BeautifulSoup does it: ``text()`` mirrors
+# ``.text.strip()`` and ``strippedText()`` mirrors ``get_text(strip=True)``.
+EXTRACT_SCRIPT = """
+const main = document.querySelector("[role='main']");
+if (!main) return null;
+
+const text = (node) => node ? node.textContent.trim() : null;
+const strippedText = (node) => {
+    if (!node) return null;
+    if (node.nodeType === Node.TEXT_NODE) return node.textContent.trim();
+    const parts = [];
+    const walker = document.createTreeWalker(node, NodeFilter.SHOW_TEXT);
+    while (walker.nextNode()) {
+        const part = walker.currentNode.textContent.trim();
+        if (part) parts.push(part);
+    }
+    return parts.join("");
+};
+
+const title = main.matches(".tAiQdd")
+    ? main.querySelector("h1.DUwDvf")
+    : main.querySelector(":scope .tAiQdd h1.DUwDvf");
+const rating = main.querySelector("span.ceNzKf");
+const reviews = main.querySelector("div.F7nice");
+const website = [...main.querySelectorAll("a[aria-label]")]
+    .find((a) => a.getAttribute("aria-label").includes("Website:"));
+const status = main.querySelector("span.ZDu9vd");
+const statusSpan = status ? status.querySelector(":scope > span") : null;
+
+return {
+    name: text(title),
+    rating: rating && rating.hasAttribute("aria-label")
+        ? rating.getAttribute("aria-label").replaceAll("stars", "").trim() : null,
+    reviews: reviews && reviews.childNodes.length > 1 ? strippedText(reviews.childNodes[1]) : null,
+    info_bars: [...main.querySelectorAll("button.CsEnBe")].map((button) => ({
+        tooltip: button.getAttribute("data-tooltip"),
+        text: text(button.querySelector("div.rogA2c"))
+    })),
+    website: website ? website.getAttribute("href") : null,
+    hours: strippedText(main.querySelector("div.t39EBf")),
+    category: text(main.querySelector("button.DkEaL")),
+    status: strippedText(statusSpan),
+    url: location.href
+};
+"""
+
+
+# A server-rendered place page carries its data in this script instead of a panel
+APP_STATE = re.compile(r"window\.APP_INITIALIZATION_STATE\s*=\s*(\[.*?\]);\s*window\.APP_FLAGS", re.S)
+XSSI_PREFIX = ")]}'"
+
+# Paths to each field inside the place array returned by place_state
+STATE_FIELDS = {
+    "Name": (11,),
+    "Category": (13, 0),
+    "Address": (39,),
+    "Website": (7, 0),
+    "Phone": (178, 0, 0),
+    "Business Status": (34, 4, 4),
+}
+STATE_RATING = (4, 7)
+STATE_REVIEWS = (4, 8)
+STATE_HOURS = (34, 1)
+
+
+def _apply_info_bar(data: dict, tooltip, text) -> None:
+    if text is None:
+        return
+    if tooltip == comparing_tool_tips["location"]:
+        data["Address"] = text
+    elif tooltip == comparing_tool_tips["phone"]:
+        data["Phone"] = text
+
+
+def record_from_script(payload: dict) -> dict:
+    """Build a record from the object returned by EXTRACT_SCRIPT"""
+    data = empty_record()
+    data["Name"] = payload.get("name")
+    data["Rating"] = payload.get("rating")
+    data["Total Reviews"] = payload.get("reviews")
+    for infoBar in payload.get("info_bars") or []:
+        _apply_info_bar(data, infoBar.get("tooltip"), infoBar.get("text"))
+    data["Website"] = payload.get("website")
+    data["Hours"] = payload.get("hours")
+    data["Category"] = payload.get("category")
+    data["Google Maps URL"] = payload.get("url")
+    data["Business Status"] = payload.get("status")
+    return data
+
+
+def parse_place_html(html: str, url: str = None) -> dict:
+    """Build a record from the outerHTML of a place page's [role='main']"""
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Initialize data dictionary with default values
+    data = empty_record()
+
+    # Extract data points with better error handling
+    try:
+        name_elem = soup.select_one(".tAiQdd h1.DUwDvf")
+        if name_elem:
+            data["Name"] = name_elem.text.strip()
+    except Exception as e:
+        print(f"Error extracting name: {e}")
+
+    try:
+        data["Rating"] = soup.find("span", class_="ceNzKf").get("aria-label").replace("stars", "").strip()
+    except: pass
+
+    try:
+        reviews = list(soup.find("div", class_="F7nice").children)
+        data["Total Reviews"] = reviews[1].get_text(strip=True)
+    except: pass
+
+    # Extract address, phone from info bars
+    for infoBar in soup.find_all("button", class_="CsEnBe"):
+        label = infoBar.find("div", class_="rogA2c")
+        _apply_info_bar(data, infoBar.get("data-tooltip"), label.text.strip() if label else None)
+
+    # Extract website (email is looked up later by the enricher)
+    try:
+        website_tag = soup.find("a", {"aria-label": lambda x: x and "Website:" in x})
+        if website_tag:
+            data["Website"] = website_tag.get("href")
+    except: pass
+
+    # Extract remaining fields
+    try:
+        data["Hours"] = soup.find("div", class_="t39EBf").get_text(strip=True)
+    except: pass
+
+    try:
+        data["Category"] = soup.find("button", class_="DkEaL").text.strip()
+    except: pass
+
+    data["Google Maps URL"] = url
+
+    try:
+        data["Business Status"] = soup.find("span", class_="ZDu9vd").findChildren("span", recursive=False)[0].get_text(strip=True)
+    except: pass
+
+    return data
+
+
+def place_state(html: str):
+    """The place array embedded in a place page as the server sends it: the
+    XSSI-prefixed JSON at APP_INITIALIZATION_STATE[3] whose 7th element
+    describes the place. None when the page has no such data"""
+    match = APP_STATE.search(html)
+    if not match:
+        return None
+    try:
+        state = json.loads(match.group(1))
+    except ValueError:
+        return None
+    blobs = state[3] if len(state) > 3 and isinstance(state[3], list) else []
+    for blob in blobs:
+        if not isinstance(blob, str) or not blob.startswith(XSSI_PREFIX):
+            continue
+        try:
+            payload = json.loads(blob[len(XSSI_PREFIX):])
+        except ValueError:
+            continue
+        if isinstance(payload, list) and len(payload) > 6 and isinstance(payload[6], list):
+            return payload[6]
+    return None
+
+
+def _at(array, path: tuple):
+    for index in path:
+        if not isinstance(array, list) or index >= len(array):
+            return None
+        array = array[index]
+    return array
+
+
+def record_from_state(place: list, url: str = None) -> dict:
+    """Build a record from the array returned by place_state"""
+    data = empty_record()
+    for field, path in STATE_FIELDS.items():
+        value = _at(place, path)
+        data[field] = value.strip() or None if isinstance(value, str) else None
+
+    # Outbound links may be wrapped in a /url?q= redirect
+    website = data["Website"]
+    if website and website.startswith("/url?"):
+        data["Website"] = parse_qs(urlsplit(website).query).get("q", [None])[0]
+
+    rating = _at(place, STATE_RATING)
+    if isinstance(rating, (int, float)):
+        data["Rating"] = f"{rating:.1f}"
+    reviews = _at(place, STATE_REVIEWS)
+    if isinstance(reviews, int):
+        data["Total Reviews"] = f"({reviews:,})"
+    hours = _at(place, STATE_HOURS)
+    if isinstance(hours, list):
+        # Same text as the panel's hours table: day then its ranges, unspaced
+        data["Hours"] = "".join(_hours_row(row) for row in hours) or None
+    data["Google Maps URL"] = url
+    return data
+
+
+def _hours_row(row) -> str:
+    """One day of the hours table; rows of another shape add nothing"""
+    if not isinstance(row, list) or not row or not isinstance(row[0], str):
+        return ""
+    ranges = row[1] if len(row) > 1 and isinstance(row[1], list) else []
+    return row[0] + "".join(part for part in ranges if isinstance(part, str))
+
+
+def record_from_page(html: str, url: str = None) -> dict:
+    """Build a record from a place page fetched over HTTP, or None when the
+    page carries no place data (e.g. a consent page or a new layout)"""
+    place = place_state(html)
+    if place is None:
+        return None
+    return record_from_state(place, url=url)
@@ -0,0 +1,78 @@
+import re
+from bs4 import BeautifulSoup
+
+# Feature id in a place href's data segment, e.g. "!1s0x396db5...:0x3f1c..."
+FEATURE_ID = re.compile(r"!1s(0x[0-9a-fA-F]+:0x[0-9a-fA-F]+)")
+
+
+def empty_record() -> dict:
+    """A record with every field Parser produces, all unset"""
+    return {
+        "Category": None,
+        "Name": None,
+        "Phone": None,
+        "Google Maps URL": None,
+        "Website": None,
+        "email": None,
+        "Business Status": None,
+        "Address": None,
+        "Total Reviews": None,
+        "Booking Links": None,
+        "Rating": None,
+        "Hours": None
+    }
+
+
+def place_id(url: str) -> str:
+    """Identify a place by its result link, whatever query listed it: the
+    feature id when the href has one, otherwise the URL without its query"""
+    match = FEATURE_ID.search(url or "")
+    if match:
+        return match.group(1).lower()
+    return (url or "").split("?")[0]
+
+
+def _text(tag):
+    return tag.get_text(strip=True) if tag else None
+
+
+def _row_parts(row) -> list:
+    """Split a ``W4Efsd`` info row on its "·" separators"""
+    parts = [part.strip() for part in row.get_text(" ", strip=True).split("·")]
+    return [part for part in parts if part]
+
+
+def parse_card(anchor) -> dict:
+    """Build a record from one result card, given its ``a.hfpxzc`` anchor"""
+    card = anchor.find_parent("div", class_="Nv2PK") or anchor.parent
+    data = empty_record()
+    data["Google Maps URL"] = anchor.get("href")
+    data["Name"] = anchor.get("aria-label") or _text(card.find(class_="qBF1Pd"))
+    data["Rating"] = _text(card.find("span", class_="MW4etd"))
+    data["Total Reviews"] = _text(card.find("span", class_="UY7F9"))
+    data["Phone"] = _text(card.find("span", class_="UsdlK"))
+
+    website = card.find("a", class_="lcr4fd")
+    if website:
+        data["Website"] = website.get("href")
+
+    # Info rows: "Category · [price ·] Address" then "Status · Hours · Phone"
+    rows = [row for row in card.select(".W4Efsd > .W4Efsd") if _row_parts(row)]
+    if rows:
+        parts = _row_parts(rows[0])
+        data["Category"] = parts[0]
+        if len(parts) > 1:
+            data["Address"] = parts[-1]
+    if len(rows) > 1:
+        parts = _row_parts(rows[1])
+        if data["Phone"] and parts and parts[-1] == data["Phone"]:
+            parts = parts[:-1]
+        if parts:
+            data["Business Status"] = parts[0]
+    return data
+
+
+def parse_feed_cards(html: str) -> list:
+    """Parse every result card in the ``[role='feed']`` HTML, in feed order"""
+    soup = BeautifulSoup(html, "html.parser")
+    return [parse_card(anchor) for anchor in soup.find_all("a", class_="hfpxzc")]
@@ -0,0 +1,219 @@
+import os
+import threading
+import time
+import weakref
+from scraper.metrics import metrics
+from config.setting import DRIVER_MAX_PAGES, DRIVER_MAX_RSS_MB, REAP_INTERVAL
+
+try:
+    import psutil
+except ImportError:  # browsers are then only recycled by page count, and never reaped
+    psutil = None
+
+# Added to every browser's command line so the reaper only touches browsers
+# this server (or a crashed earlier run of it) started
+OWNER_SWITCH = "--gms-owner="
+# Processes younger than this may belong to a driver still starting up
+REAP_GRACE = 60
+
+
+class GovernedDriver:
+    """A pooled WebDriver whose browser can be swapped for a fresh one
+    between pages. Attribute access is forwarded to the current browser, so
+    every Parser, Scroller or pipeline worker holding this object carries on
+    after a recycle without noticing."""
+
+    def __init__(self, governor, driver, spawn) -> None:
+        self._governor = governor
+        self._driver = driver
+        self._spawn = spawn
+        self.pages = 0
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+class BrowserGovernor:
+    """Bounds what long-lived browsers may cost the host.
+
+    Pooled drivers count the pages they open. Before the next navigation a
+    driver past ``max_pages`` pages, or whose browser process tree uses more
+    than ``max_rss_mb``, is replaced by a fresh browser (see GovernedDriver).
+    Every ``reap_interval`` seconds chromium and chromedriver processes that
+    belong to no live driver are killed: browsers of a crashed earlier run,
+    or ones whose driver was dropped without ``quit``.
+    """
+
+    def __init__(self, max_pages: int = DRIVER_MAX_PAGES, max_rss_mb: float = DRIVER_MAX_RSS_MB,
+                 reap_interval: float = REAP_INTERVAL) -> None:
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.reap_interval = reap_interval
+        self.driver_path = None
+        self._drivers = weakref.WeakSet()  # every live WebDriver, pooled or not
+        self._governed = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def owner_switch(self) -> str:
+        return f"{OWNER_SWITCH}{os.getpid()}"
+
+    def track(self, driver) -> None:
+        """Mark a newly started WebDriver's processes as in use"""
+        with self._lock:
+            self._drivers.add(driver)
+
+    def untrack(self, driver) -> None:
+        with self._lock:
+            self._drivers.discard(getattr(driver, "_driver", driver))
+
+    def govern(self, driver, spawn) -> GovernedDriver:
+        """Wrap a pooled driver; ``spawn`` starts its replacements"""
+        governed = GovernedDriver(self, driver, spawn)
+        with self._lock:
+            self._governed.add(governed)
+        return governed
+
+    def navigating(self, driver) -> None:
+        """Called before each page load; recycles an exhausted browser first"""
+        if not isinstance(driver, GovernedDriver):
+            return
+        reason = self.over_limit(driver)
+        if reason:
+            self.recycle(driver, reason)
+        driver.pages += 1
+
+    def over_limit(self, driver: GovernedDriver) -> str:
+        if self.max_pages and driver.pages >= self.max_pages:
+            return "pages"
+        if self.max_rss_mb:
+            rss = self.rss(driver)
+            if rss is not None and rss > self.max_rss_mb * 1024 * 1024:
+                return "rss"
+        return None
+
+    def recycle(self, driver: GovernedDriver, reason: str) -> None:
+        """Swap the browser behind ``driver`` for a fresh one"""
+        old = driver._driver
+        print(f"Recycling browser after {driver.pages} pages ({reason})")
+        driver._driver = driver._spawn()
+        driver.pages = 0
+        self.untrack(old)
+        try:
+            old.quit()
+        except Exception as e:
+            print(f"Error quitting recycled driver: {str(e)}")
+        metrics.inc("driver_recycles_total", reason=reason)
+
+    @staticmethod
+    def _tree(driver) -> list:
+        """The chromedriver process of ``driver`` and all its descendants"""
+        try:
+            root = psutil.Process(driver.service.process.pid)
+            return [root] + root.children(recursive=True)
+        except (AttributeError, psutil.Error):
+            return []
+
+    def rss(self, driver) -> int:
+        """Bytes resident in the driver's process tree, None when unknown"""
+        if psutil is None:
+            return None
+        total = 0
+        for process in self._tree(driver):
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                continue
+        return total
+
+    def stats(self) -> dict:
+        with self._lock:
+            governed = list(self._governed)
+        return {
+            "browsers": len(governed),
+            "pages": sum(driver.pages for driver in governed),
+            "rss_bytes": sum(self.rss(driver) or 0 for driver in governed),
+        }
+
+    def start(self, driver_path: str = None) -> None:
+        """Start reaping in the background"""
+        self.driver_path = driver_path
+        if psutil is None:
+            print("psutil is not installed; orphaned browsers will not be reaped")
+            return
+        if not self.reap_interval or self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._reap_loop, daemon=True, name="browser-reaper")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _reap_loop(self) -> None:
+        while not self._stop.wait(self.reap_interval):
+            try:
+                self.reap()
+            except Exception as e:
+                print(f"Error reaping browsers: {str(e)}")
+
+    def _orphaned(self, process, live: set) -> str:
+        """"browser" or "chromedriver" when ``process`` is one of ours that no
+        live driver owns, else None"""
+        if process.pid in live or time.time() - process.create_time() < REAP_GRACE:
+            return None
+        cmdline = process.cmdline()
+        if not cmdline:
+            return None
+        owner = next((arg[len(OWNER_SWITCH):] for arg in cmdline if arg.startswith(OWNER_SWITCH)), None)
+        if owner is not None:
+            # A browser of this process, or of an earlier run that is gone
+            if owner == str(os.getpid()) or not owner.isdigit() or not psutil.pid_exists(int(owner)):
+                return "browser"
+            return None
+        if self.driver_path and cmdline[0] == self.driver_path:
+            parent = process.ppid()
+            if parent == os.getpid() or parent == 1 or not psutil.pid_exists(parent):
+                return "chromedriver"
+        return None
+
+    def reap(self) -> int:
+        """Kill our chromium/chromedriver process trees that no live driver
+        owns; returns the number of processes killed"""
+        if psutil is None:
+            return 0
+        with self._lock:
+            drivers = list(self._drivers)
+        live = {process.pid for driver in drivers for process in self._tree(driver)}
+
+        killed = 0
+        for process in psutil.process_iter():
+            try:
+                kind = self._orphaned(process, live)
+                if not kind:
+                    continue
+                tree = process.children(recursive=True) + [process]
+            except psutil.Error:
+                continue
+            reaped = 0
+            for victim in tree:
+                if victim.pid in live:
+                    continue
+                try:
+                    victim.kill()
+                    reaped += 1
+                except psutil.Error:
+                    continue
+            if reaped:
+                metrics.inc("orphans_reaped_total", reaped, kind=kind)
+                print(f"Reaped orphaned {kind} process tree {process.pid} ({reaped} processes)")
+            killed += reaped
+        return killed
+
+
+governor = BrowserGovernor()
@@ -0,0 +1,93 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket bounds in seconds, from a DOM round-trip up to a slow page load
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class Metrics:
+    """Process-wide stage timings and counters, rendered in the Prometheus
+    text format by ``/metrics``.
+
+    Every stage duration lands in one ``gms_stage_seconds`` histogram
+    labelled by stage. When a JobContext is passed it is also added to that
+    job's timing breakdown, so a single response can show where its time went.
+    """
+
+    def __init__(self, buckets: tuple = BUCKETS) -> None:
+        self.buckets = buckets
+        self._stages = {}  # stage -> [count per bucket..., +Inf count, sum]
+        self._counters = {}  # (name, labels) -> value
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float, context=None) -> None:
+        with self._lock:
+            series = self._stages.setdefault(stage, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += seconds
+        if context is not None:
+            context.add_timing(stage, seconds)
+
+    @contextmanager
+    def timer(self, stage: str, context=None):
+        """Time the enclosed block as ``stage``, whether or not it raises"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.monotonic() - started, context)
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    @staticmethod
+    def _labels(labels) -> str:
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+    def render(self, gauges: dict = None) -> str:
+        """Prometheus text exposition of every metric; ``gauges`` maps
+        ``(name, help)`` to a value or to ``{labels tuple: value}``"""
+        with self._lock:
+            stages = {stage: list(series) for stage, series in self._stages.items()}
+            counters = dict(self._counters)
+
+        lines = [
+            "# HELP gms_stage_seconds Time spent per scraping stage",
+            "# TYPE gms_stage_seconds histogram",
+        ]
+        for stage, series in sorted(stages.items()):
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'gms_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'gms_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {series[-2]}')
+            lines.append(f'gms_stage_seconds_count{{stage="{stage}"}} {series[-2]}')
+            lines.append(f'gms_stage_seconds_sum{{stage="{stage}"}} {series[-1]}')
+
+        names = sorted({name for name, _ in counters})
+        for name in names:
+            lines.append(f"# TYPE gms_{name} counter")
+            for (counter, labels), value in sorted(counters.items()):
+                if counter == name:
+                    lines.append(f"gms_{name}{self._labels(labels)} {value}")
+
+        for (name, help_text), value in (gauges or {}).items():
+            lines.append(f"# HELP gms_{name} {help_text}")
+            lines.append(f"# TYPE gms_{name} gauge")
+            series = value if isinstance(value, dict) else {(): value}
+            for labels, sample in series.items():
+                lines.append(f"gms_{name}{self._labels(labels)} {sample}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
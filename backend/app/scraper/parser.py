@@ -1,153 +1,358 @@
-from bs4 import BeautifulSoup
+from selenium.common.exceptions import WebDriverException
 from scraper.base import Base
-from scraper.common import Common
-import requests
-import re
+from scraper.common import JobContext
+from scraper.enrichment import EmailEnricher
+from scraper.extract import EXTRACT_SCRIPT, record_from_script, parse_place_html
+from scraper.feed import place_id
+from scraper.fetch import PlaceFetcher
+from scraper.metrics import metrics
+from scraper.store import PlaceStore
+import threading
+import queue
+import time
+from concurrent.futures import as_completed
+
+# Fields feed cards usually lack; hybrid mode opens the place page for them
+DETAIL_FIELDS = ("Phone", "Website")
 
 class Parser(Base):
-    def __init__(self, driver) -> None:
+    def __init__(self, driver, context: JobContext, pool=None, enricher: EmailEnricher = None,
+                 engine: str = "script", store: PlaceStore = None) -> None:
+        """
+        Args:
+            engine (str): "script" reads each page with one in-browser script
+                (falling back to BeautifulSoup if it errors); "soup" always
+                parses the panel HTML with BeautifulSoup; "http" fetches pages
+                without a browser (see PlaceFetcher) and reads only the places
+                it could not parse with the "script" engine
+            store (PlaceStore): Where place-page records are saved, and served
+                from while younger than ``context.max_age`` (default: shared store)
+        """
         self.driver = driver
+        self.engine = engine
+        self.context = context
+        self.pool = pool
+        self.enricher = enricher or EmailEnricher.shared()
+        self.store = store or PlaceStore.shared()
         self.finalData = []
-        self.comparing_tool_tips = {
-            "location": "Copy address",
-            "phone": "Copy phone number",
-            "website": "Open website",
-            "booking": "Open booking link",
-        }
+        self.parsedCount = 0
+        self.storedCount = 0
+        self.startedAt = time.monotonic()
+        self.firstRecordAt = None
+        self.browsers = 1
+        self._enrichments = []
+        self._lock = threading.Lock()
 
     def parse(self):
+        """Extract one record from the place page currently open in the driver"""
+        if self.engine in ("script", "http"):
+            try:
+                with metrics.timer("extract_script", self.context):
+                    payload = self.driver.execute_script(EXTRACT_SCRIPT)
+            except WebDriverException as e:
+                metrics.inc("extract_script_failures_total")
+                print(f"Extraction script failed, falling back to HTML parsing: {e.msg}")
+            else:
+                if not payload:
+                    print("Info sheet not found, skipping...")
+                    return None
+                return record_from_script(payload)
+        return self.parse_soup()
+
+    def parse_soup(self):
+        """Fetch the place panel's HTML and parse it with BeautifulSoup"""
         try:
-            infoSheet = self.driver.execute_script(
-                """return document.querySelector("[role='main']")"""
-            )
-            
+            with metrics.timer("html_fetch", self.context):
+                infoSheet = self.driver.execute_script(
+                    """return document.querySelector("[role='main']")"""
+                )
+                html = infoSheet.get_attribute("outerHTML") if infoSheet else None
+                url = self.driver.current_url
+
             if not infoSheet:
                 print("Info sheet not found, skipping...")
                 return
-                
-            html = infoSheet.get_attribute("outerHTML")
+
             if not html:
                 print("No HTML content found, skipping...")
                 return
-                
-            soup = BeautifulSoup(html, "html.parser")
-
-            # Initialize data dictionary with default values
-            data = {
-                "Category": None,
-                "Name": None,
-                "Phone": None,
-                "Google Maps URL": None,
-                "Website": None,
-                "email": None,
-                "Business Status": None,
-                "Address": None,
-                "Total Reviews": None,
-                "Booking Links": None,
-                "Rating": None,
-                "Hours": None
-            }
-
-            # Extract data points with better error handling
-            try:
-                name_elem = soup.select_one(".tAiQdd h1.DUwDvf")
-                if name_elem:
-                    data["Name"] = name_elem.text.strip()
-            except Exception as e:
-                print(f"Error extracting name: {e}")
 
-            try:
-                data["Rating"] = soup.find("span", class_="ceNzKf").get("aria-label").replace("stars", "").strip()
-            except: pass
+            with metrics.timer("soup_parse", self.context):
+                return parse_place_html(html, url=url)
 
-            try:
-                reviews = list(soup.find("div", class_="F7nice").children)
-                data["Total Reviews"] = reviews[1].get_text(strip=True)
-            except: pass
-
-            # Extract address, phone from info bars
-            for infoBar in soup.find_all("button", class_="CsEnBe"):
-                tooltip = infoBar.get("data-tooltip")
-                text = infoBar.find("div", class_="rogA2c").text.strip()
-                
-                if tooltip == self.comparing_tool_tips["location"]:
-                    data["Address"] = text
-                elif tooltip == self.comparing_tool_tips["phone"]:
-                    data["Phone"] = text
-
-            # Extract website and email
-            try:
-                website_tag = soup.find("a", {"aria-label": lambda x: x and "Website:" in x})
-                if website_tag:
-                    data["Website"] = website_tag.get("href")
-                    data["email"] = self.find_mail(data["Website"])
-            except: pass
+        except Exception as e:
+            print(f"Error parsing location: {str(e)}")
 
-            # Extract remaining fields
-            try:
-                data["Hours"] = soup.find("div", class_="t39EBf").get_text(strip=True)
-            except: pass
+    def main(self, allResultsLinks, concurrency: int = 1) -> list:
+        """Open and parse every result link.
+        Args:
+            allResultsLinks (list): Place URLs in feed order
+            concurrency (int): Browsers used in parallel; extra ones are
+                borrowed from the pool only if idle, otherwise fewer are used
+        Returns the records aligned with the links (None for failed pages)
+        """
+        started = time.monotonic()
+        stored = self.from_store(allResultsLinks)
+        pending = [(index, link) for index, link in enumerate(allResultsLinks) if index not in stored]
+        if stored:
+            print(f"Skipping {len(stored)} of {len(allResultsLinks)} places already checkpointed or stored")
 
-            try:
-                data["Category"] = soup.find("button", class_="DkEaL").text.strip()
-            except: pass
+        results = [stored.get(index) for index in range(len(allResultsLinks))]
+        parsed = self.collect([link for _, link in pending], concurrency)
+        for (index, _), data in zip(pending, parsed):
+            results[index] = data
+        if self.context.retain_records:
+            self.finalData.extend(data for data in results if data)
 
-            try:
-                data["Google Maps URL"] = self.driver.current_url
-            except: pass
+        # Website crawls overlapped with navigation; collect the stragglers
+        self.enricher.wait(self._enrichments, self.context)
+        self._report(started)
+        return results
 
-            try:
-                data["Business Status"] = soup.find("span", class_="ZDu9vd").findChildren("span", recursive=False)[0].get_text(strip=True)
-            except: pass
+    def from_feed(self, cards, hybrid: bool = False, concurrency: int = 1) -> list:
+        """Build records from feed cards instead of place pages.
+        Args:
+            cards (list): Records parsed from the results feed, in feed order
+            hybrid (bool): Open the place page of cards missing any of
+                DETAIL_FIELDS and merge the page's fields over the card
+            concurrency (int): Browsers used for the hybrid detail visits
+        Returns the records aligned with the cards
+        """
+        started = time.monotonic()
+        records = []
+        resumed = {id(card) for card in cards if self.resumed(place_id(card["Google Maps URL"]))}
+        incomplete = [
+            card for card in cards
+            if hybrid and id(card) not in resumed and not all(card.get(field) for field in DETAIL_FIELDS)
+        ]
+        details = self.collect([card["Google Maps URL"] for card in incomplete], concurrency, finalize=False)
+        merged = {id(card): detail for card, detail in zip(incomplete, details) if detail}
 
-            self.finalData.append(data)
+        for card in cards:
+            if id(card) in resumed:
+                records.append(None)
+                continue
+            data = merged.pop(id(card), None)
+            if data:
+                for field, value in card.items():
+                    if data.get(field) is None:
+                        data[field] = value
+            else:
+                data = card
+            self.finish_record(data, place=place_id(card["Google Maps URL"]))
+            records.append(data)
+            if self.context.retain_records:
+                self.finalData.append(data)
 
-        except Exception as e:
-            print(f"Error parsing location: {str(e)}")
+        self.enricher.wait(self._enrichments, self.context)
+        self._report(started)
+        return records
 
-    def find_mail(self, url):
-        if not url:
-            return None
-            
-        try:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36"
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-            text = response.text
-            
-            emails = re.findall(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", text)
-            
-            if not emails:
-                # Try contact page
-                contact_urls = [f"{url.rstrip('/')}/contact", f"{url.rstrip('/')}/contact-us"]
-                for contact_url in contact_urls:
-                    try:
-                        response = requests.get(contact_url, headers=headers, timeout=10)
-                        emails = re.findall(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", response.text)
-                        if emails:
-                            break
-                    except:
-                        continue
-
-            # Validate and clean emails
-            valid_emails = [
-                email for email in set(emails)
-                if re.match(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$", email)
-            ]
-            
-            return ", ".join(valid_emails) if valid_emails else None
+    def from_pipeline(self, pipeline, driver):
+        """Collect the records of a LinkPipeline once the feed has ended,
+        letting ``driver`` (the scroller's) join the remaining work"""
+        records = pipeline.finish(driver)
+        if self.context.retain_records:
+            self.finalData.extend(records)
+        self.enricher.wait(self._enrichments, self.context)
+        self._report(self.startedAt)
 
-        except Exception as e:
-            print(f"Error finding email: {str(e)}")
-            return None
+    def _report(self, started):
+        elapsed = time.monotonic() - started
+        first = f", first after {self.firstRecordAt - self.startedAt:.1f}s" if self.firstRecordAt else ""
+        print(
+            f"Parsed {self.parsedCount} places in {elapsed:.1f}s "
+            f"({self.parsedCount / elapsed if elapsed else 0:.2f} places/sec, {self.browsers} browsers{first})"
+        )
+
+    def collect(self, allResultsLinks, concurrency: int = 1, finalize: bool = True) -> list:
+        """Parse every link and return the records aligned with the links
+        (None where a page failed or the job was cancelled). With
+        ``finalize`` each record is also enriched and emitted as it is parsed
+        (and not kept when the job does not retain records)"""
+        if self.engine == "http":
+            return self._collect_http(allResultsLinks, concurrency, finalize)
+        return self._collect_browser(allResultsLinks, concurrency, finalize)
 
-    def main(self, allResultsLinks):
+    def _collect_http(self, allResultsLinks, concurrency: int, finalize: bool) -> list:
+        """Fetch every link over HTTP, then open the places that could not
+        be read that way in the browser"""
+        fetcher = PlaceFetcher.shared()
+        results = [None] * len(allResultsLinks)
+        futures = {fetcher.submit(link, self.context): index for index, link in enumerate(allResultsLinks)}
+        fallback = []
+        for future in as_completed(futures):
+            index = futures[future]
+            data = future.result()
+            if data is None:
+                fallback.append(index)
+                continue
+            if finalize:
+                self.finish_record(data, place=place_id(allResultsLinks[index]), page=True)
+                if not self.context.retain_records:
+                    data = None
+            results[index] = data
+
+        if fallback and not self.context.is_cancelled():
+            fallback.sort()
+            print(f"{len(fallback)} of {len(allResultsLinks)} places could not be read over HTTP, opening them")
+            metrics.inc("place_fetch_fallbacks_total", len(fallback))
+            records = self._collect_browser([allResultsLinks[index] for index in fallback], concurrency, finalize)
+            for index, data in zip(fallback, records):
+                results[index] = data
+        return results
+
+    def _collect_browser(self, allResultsLinks, concurrency: int, finalize: bool) -> list:
+        drivers = [self.driver]
+        if self.pool:
+            while len(drivers) < min(concurrency, len(allResultsLinks)):
+                driver = self.pool.try_acquire()
+                if not driver:
+                    break
+                drivers.append(driver)
+        self.browsers = len(drivers)
+
+        results = [None] * len(allResultsLinks)
         try:
-            for resultLink in allResultsLinks:
-                if Common.close_thread_is_set():
-                    return
-                self.openingurl(url=resultLink)
-                self.parse()
+            if len(drivers) == 1:
+                self._parse_serial(allResultsLinks, results, finalize)
+            else:
+                self._parse_sharded(allResultsLinks, results, drivers, finalize)
         except Exception as e:
             print(f"Error processing results: {str(e)}")
+        finally:
+            for driver in drivers[1:]:
+                self.pool.release(driver)
+        return results
+
+    def serves_stored(self) -> bool:
+        # Re-crawling emails means the stored ones must not be reused either
+        return bool(self.store and self.context.max_age and not self.context.refresh_emails)
+
+    def resumed(self, place: str) -> bool:
+        """True when ``place`` is already in the job's checkpoint record log;
+        it is counted as parsed but not emitted again"""
+        checkpoint = self.context.checkpoint
+        if not checkpoint or place not in checkpoint.done:
+            return False
+        with self._lock:
+            self.parsedCount += 1
+        return True
+
+    def from_store(self, allResultsLinks) -> dict:
+        """Finish every link already in the job's checkpoint or with a fresh
+        record in the place store, returned as ``{index: record}`` (record
+        None when not retained)"""
+        keys = [place_id(link) for link in allResultsLinks]
+        found = {index: None for index, key in enumerate(keys) if self.resumed(key)}
+        if not self.serves_stored() or len(found) == len(keys):
+            return found
+        fresh = self.store.get_many([key for index, key in enumerate(keys) if index not in found],
+                                    self.context.max_age)
+        for index, key in enumerate(keys):
+            if index not in found and key in fresh:
+                found[index] = self._serve(key, fresh[key])
+        return found
+
+    def stored(self, resultLink):
+        """``(True, record)`` when ``resultLink`` was resumed or served from the store"""
+        key = place_id(resultLink)
+        if self.resumed(key):
+            return True, None
+        if not self.serves_stored():
+            return False, None
+        data = self.store.get(key, self.context.max_age)
+        if data is None:
+            return False, None
+        return True, self._serve(key, data)
+
+    def _serve(self, place: str, data):
+        metrics.inc("places_from_store_total")
+        with self._lock:
+            self.parsedCount += 1
+            self.storedCount += 1
+            if self.firstRecordAt is None:
+                self.firstRecordAt = time.monotonic()
+        self.save(place, data)
+        return data if self.context.retain_records else None
+
+    def finish_record(self, data, place: str = None, page: bool = False):
+        """Queue the email lookup for a complete record and hand it to the
+        job's ``on_record`` callback once the lookup is done. The record is
+        then logged to the job's checkpoint under ``place``, and saved to the
+        place store when it was read from a place ``page``"""
+        metrics.inc("places_parsed_total")
+        with self._lock:
+            self.parsedCount += 1
+            if self.firstRecordAt is None:
+                self.firstRecordAt = time.monotonic()
+        then = self.emit
+        if place:
+            then = lambda record: self.save(place, record, page)
+        if data.get("Website"):
+            self._enrichments.append(self.enricher.submit(data, self.context, then=then))
+        else:
+            then(data)
+
+    def save(self, place: str, data, page: bool = False):
+        # A stopped job may have dropped the email lookup; don't store that
+        # for later jobs
+        if page and self.store and not self.context.is_cancelled():
+            self.store.put(place, data)
+        # Past the deadline the record is still part of the job's results;
+        # only an explicit cancel leaves it to a resumed run
+        if self.context.checkpoint and not self.context.cancelled:
+            self.context.checkpoint.add_record(place, data)
+        self.emit(data)
+
+    def emit(self, data):
+        if self.context.on_record:
+            self.context.on_record(data)
+
+    def parse_link(self, shard, resultLink, results, index, finalize: bool = True) -> bool:
+        """Open one link with ``shard``'s driver and store its record in
+        ``results[index]``. Returns False once the job is cancelled"""
+        if not shard.openingurl(url=resultLink):
+            return False
+        data = shard.parse()
+        if data and finalize:
+            self.finish_record(data, place=place_id(resultLink), page=True)
+            if not self.context.retain_records:
+                data = None
+        results[index] = data
+        return True
+
+    def _parse_serial(self, allResultsLinks, results, finalize: bool = True):
+        for index, resultLink in enumerate(allResultsLinks):
+            try:
+                if not self.parse_link(self, resultLink, results, index, finalize):
+                    return
+            except WebDriverException as e:
+                # Navigation gave up on this page (max_retries); move on
+                print(f"Error processing {resultLink}: {e.msg}")
+
+    def _parse_sharded(self, allResultsLinks, results, drivers, finalize: bool = True):
+        """Let one worker per driver pull links from a shared queue; records
+        land in ``results`` at their feed position"""
+        work = queue.Queue()
+        for index, resultLink in enumerate(allResultsLinks):
+            work.put((index, resultLink))
+
+        def worker(driver):
+            shard = Parser(driver, self.context, enricher=self.enricher, engine=self.engine)
+            while True:
+                try:
+                    index, resultLink = work.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    if not self.parse_link(shard, resultLink, results, index, finalize):
+                        return
+                except Exception as e:
+                    print(f"Error processing {resultLink}: {str(e)}")
+
+        threads = [threading.Thread(target=worker, args=(driver,), daemon=True) for driver in drivers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
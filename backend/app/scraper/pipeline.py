@@ -0,0 +1,100 @@
+import queue
+import threading
+from scraper.parser import Parser
+from scraper.pool import DriverPool
+
+
+class LinkPipeline:
+    """Bounded producer/consumer hand-off between Scroller and place-page workers.
+
+    The scroller ``put``s each link as soon as it appears in the feed; one
+    worker thread per borrowed driver parses links while scrolling continues.
+    ``finish`` lets the scroller's own driver help drain the queue, waits for
+    the workers and returns the records in feed order.
+    """
+
+    def __init__(self, parser: Parser, drivers: list, maxsize: int) -> None:
+        self.parser = parser
+        self.context = parser.context
+        self.drivers = drivers
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.results = []
+        self.errors = []
+        self._ended = threading.Event()
+        self._backlog = []
+        self._threads = [
+            threading.Thread(target=self._worker, args=(driver,), daemon=True, name="pipeline")
+            for driver in drivers
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def alive(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def put(self, link: str) -> None:
+        """Queue a link for parsing, blocking while the queue is full"""
+        served, data = self.parser.stored(link)
+        if served:
+            self.results.append(data)
+            return
+        item = (len(self.results), link)
+        self.results.append(None)
+        while not self.context.is_cancelled():
+            if not self.alive():
+                # Every worker died; the scroller's driver parses these in finish()
+                self._backlog.append(item)
+                return
+            try:
+                self.queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _next(self):
+        while not self.context.is_cancelled():
+            try:
+                return self.queue.get(timeout=0.2)
+            except queue.Empty:
+                if self._ended.is_set():
+                    return None
+        return None
+
+    def _worker(self, driver) -> None:
+        shard = Parser(driver, self.context, enricher=self.parser.enricher, engine=self.parser.engine)
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            index, link = item
+            try:
+                if not self.parser.parse_link(shard, link, self.results, index):
+                    return
+            except Exception as e:
+                print(f"Error processing {link}: {str(e)}")
+                if not DriverPool.is_healthy(driver):
+                    # Hand the link back and retire this worker
+                    self._backlog.append(item)
+                    self.errors.append(e)
+                    return
+
+    def finish(self, driver=None) -> list:
+        """Mark the end of the feed, help drain the queue with ``driver`` and
+        return the parsed records in feed order"""
+        self._ended.set()
+        if driver is not None:
+            self._worker(driver)
+        for thread in self._threads:
+            thread.join()
+
+        # Links left behind by dead workers
+        if driver is not None:
+            for index, link in self._backlog:
+                try:
+                    if not self.parser.parse_link(self.parser, link, self.results, index):
+                        break
+                except Exception as e:
+                    print(f"Error processing {link}: {str(e)}")
+        if self.errors:
+            print(f"{len(self.errors)} pipeline workers failed: {self.errors[0]}")
+        return [data for data in self.results if data]
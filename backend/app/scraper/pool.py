@@ -0,0 +1,230 @@
+import queue
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import WebDriverException
+from webdriver_manager.chrome import ChromeDriverManager
+from scraper.governor import governor
+from scraper.metrics import metrics
+from scraper.resources import profile
+from config.setting import CHROME_BINARY, CHROMEDRIVER_PATH
+
+
+def chrome_options(headless: int) -> webdriver.ChromeOptions:
+    """Build the Chrome options used for every scraping browser
+    Args:
+        headless (int): Whether to run in headless mode (1=headless, 0=visible)
+    """
+    options = webdriver.ChromeOptions()
+
+    # Headless mode with proper hardware acceleration disabled
+    if headless == 1:
+        options.add_argument('--headless=new')
+        options.add_argument('--disable-gpu')
+        options.add_argument('--disable-software-rasterizer')
+
+    # Essential options
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-web-security')
+    options.add_argument('--allow-running-insecure-content')
+
+    # Disable problematic features
+    options.add_argument('--disable-webgl')
+    options.add_argument('--disable-notifications')
+    options.add_argument('--disable-popup-blocking')
+    options.add_argument('--disable-infobars')
+    options.add_argument('--disable-extensions')
+
+    # Error handling and logging
+    options.add_argument('--disable-logging')
+    options.add_argument('--log-level=3')
+    options.add_argument('--silent')
+
+    # Performance settings
+    prefs = {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2,
+        "profile.managed_default_content_settings.javascript": 1,
+        "profile.managed_default_content_settings.cookies": 1,
+        "profile.managed_default_content_settings.plugins": 2,
+        "profile.managed_default_content_settings.popups": 2,
+        "profile.managed_default_content_settings.geolocation": 2,
+        "profile.managed_default_content_settings.media_stream": 2
+    }
+    options.add_experimental_option("prefs", prefs)
+    options.add_experimental_option('excludeSwitches', ['enable-logging', 'enable-automation'])
+    options.add_experimental_option('useAutomationExtension', False)
+
+    # Lets the governor tell our browsers from any other chromium on the host
+    options.add_argument(governor.owner_switch)
+
+    # Profiles that read pages before the load event wait per stage themselves
+    options.page_load_strategy = profile.session_strategy
+
+    # *** THIS LINE IS REQUIRED FOR RENDER ***
+    options.binary_location = CHROME_BINARY
+
+    return options
+
+
+def resolve_driver_path() -> str:
+    """Locate the chromedriver binary, downloading it only when not configured"""
+    if CHROMEDRIVER_PATH:
+        return CHROMEDRIVER_PATH
+    return ChromeDriverManager().install()
+
+
+def create_driver(headless: int, driver_path: str = None) -> webdriver.Chrome:
+    """Start a new Chrome WebDriver session"""
+    service = Service(driver_path or resolve_driver_path())
+    driver = webdriver.Chrome(service=service, options=chrome_options(headless))
+    governor.track(driver)
+    profile.apply(driver)
+    return driver
+
+
+class PoolExhausted(Exception):
+    """Raised when no pooled driver became free within the lease timeout"""
+
+
+class DriverPool:
+    """A fixed-size pool of warm Chrome drivers shared between scraping jobs.
+
+    The chromedriver binary is resolved once in ``start``; drivers are health
+    checked on checkout and reset (extra tabs closed, cookies cleared) on
+    return, so a lease never sees state left behind by the previous job.
+    Drivers are wrapped by the governor, which recycles their browsers and
+    reaps orphaned ones (see scraper.governor).
+    """
+
+    def __init__(self, size: int, headless: int = 1, lease_timeout: float = 300):
+        self.size = size
+        self.headless = headless
+        self.lease_timeout = lease_timeout
+        self.driver_path = None
+        self._idle = queue.Queue()
+        self._leased = set()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self) -> None:
+        """Resolve the driver binary and launch every browser up front"""
+        self.driver_path = resolve_driver_path()
+        for _ in range(self.size):
+            self._idle.put(self._spawn())
+        governor.start(self.driver_path)
+        print(f"Driver pool started with {self.size} browsers")
+
+    def _launch(self):
+        with metrics.timer("driver_startup"):
+            return create_driver(self.headless, self.driver_path)
+
+    def _spawn(self):
+        return governor.govern(self._launch(), spawn=self._launch)
+
+    @staticmethod
+    def is_healthy(driver) -> bool:
+        try:
+            return driver.execute_script("return 1") == 1
+        except WebDriverException:
+            return False
+
+    @staticmethod
+    def _quit(driver) -> None:
+        governor.untrack(driver)
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Error quitting driver: {str(e)}")
+
+    def reset(self, driver) -> None:
+        """Bring a driver back to a blank single-tab, cookie-less state"""
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.delete_all_cookies()
+        driver.get("about:blank")
+
+    def acquire(self, timeout: float = None):
+        """Check out a healthy driver, replacing dead ones transparently"""
+        if self._closed:
+            raise PoolExhausted("Driver pool is closed")
+        try:
+            driver = self._idle.get(timeout=timeout or self.lease_timeout)
+        except queue.Empty:
+            raise PoolExhausted(f"No driver available after {timeout or self.lease_timeout}s")
+
+        return self._checkout(driver)
+
+    def try_acquire(self):
+        """Check out a driver only if one is idle right now, else return None"""
+        if self._closed:
+            return None
+        try:
+            driver = self._idle.get_nowait()
+        except queue.Empty:
+            return None
+        return self._checkout(driver)
+
+    def _checkout(self, driver):
+        if not self.is_healthy(driver):
+            print("Pooled driver failed health check, replacing it")
+            self._quit(driver)
+            driver = self._spawn()
+
+        with self._lock:
+            self._leased.add(driver)
+        return driver
+
+    def release(self, driver) -> None:
+        """Return a leased driver to the pool"""
+        with self._lock:
+            self._leased.discard(driver)
+
+        if self._closed:
+            self._quit(driver)
+            return
+
+        try:
+            self.reset(driver)
+        except WebDriverException:
+            print("Could not reset pooled driver, replacing it")
+            self._quit(driver)
+            try:
+                driver = self._spawn()
+            except Exception as e:
+                # Keep the pool size stable; acquire() will retry the spawn
+                print(f"Error replacing driver: {str(e)}")
+        self._idle.put(driver)
+
+    @contextmanager
+    def lease(self, timeout: float = None):
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def stats(self) -> dict:
+        with self._lock:
+            leased = len(self._leased)
+        return {"size": self.size, "idle": self._idle.qsize(), "leased": leased}
+
+    def close(self) -> None:
+        """Quit every idle and leased driver"""
+        self._closed = True
+        governor.stop()
+        while True:
+            try:
+                self._quit(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        with self._lock:
+            leased = list(self._leased)
+            self._leased.clear()
+        for driver in leased:
+            self._quit(driver)
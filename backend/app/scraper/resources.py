@@ -0,0 +1,138 @@
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from scraper.metrics import metrics
+from config.setting import RESOURCE_PROFILE, RESOURCE_STATS
+
+# Network.setBlockedURLs only matches URLs, so resource types are blocked
+# through the file extensions and hosts that serve them
+TYPE_PATTERNS = {
+    "image": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.ico*", "*.svg*", "*/maps/vt*", "*/kh/v=*",
+              "*/maps/api/staticmap*", "*.googleusercontent.com/*", "*.ggpht.com/*"],
+    "font": ["*.woff*", "*.ttf*", "*.otf*", "*fonts.gstatic.com/*", "*fonts.googleapis.com/*"],
+    "media": ["*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*"],
+    "tracking": ["*google-analytics.com/*", "*googletagmanager.com/*", "*doubleclick.net/*", "*/gen_204*",
+                 "*/log?*", "*/csi?*", "*/analytics.js*"],
+}
+
+# document.readyState values each page-load strategy waits for
+READY_STATES = {
+    "normal": ("complete",),
+    "eager": ("interactive", "complete"),
+    "none": None,
+}
+
+# Requests and bytes the current page has loaded so far
+PAGE_STATS_SCRIPT = """
+const entries = performance.getEntriesByType("navigation").concat(performance.getEntriesByType("resource"));
+return {
+    requests: entries.length,
+    bytes: entries.reduce((total, entry) => total + (entry.transferSize || entry.encodedBodySize || 0), 0)
+};
+"""
+
+
+class ResourceProfile:
+    """What a browser may download, and how long navigation waits, per stage.
+
+    ``blocked`` lists TYPE_PATTERNS keys and ``block_urls`` extra URL
+    patterns. ``strategies`` maps a stage ("scroll" for the results feed,
+    "detail" for place pages) to a page-load strategy, and ``ready`` to a
+    selector that must exist before the stage reads the page. A profile
+    whose stages all load "normal"ly keeps Chrome's own page-load handling;
+    otherwise the session is started with strategy "none" and ``wait_loaded``
+    does the waiting per stage.
+    """
+
+    def __init__(self, name: str, blocked: tuple = (), block_urls: tuple = (), strategies: dict = None,
+                 ready: dict = None, ready_timeout: float = 10) -> None:
+        self.name = name
+        self.blocked = blocked
+        self.block_urls = block_urls
+        self.strategies = strategies or {}
+        self.ready = ready or {}
+        self.ready_timeout = ready_timeout
+
+    @property
+    def patterns(self) -> list:
+        return [pattern for kind in self.blocked for pattern in TYPE_PATTERNS[kind]] + list(self.block_urls)
+
+    @property
+    def session_strategy(self) -> str:
+        if all(strategy == "normal" for strategy in self.strategies.values()):
+            return "normal"
+        return "none"
+
+    def apply(self, driver) -> None:
+        """Install the URL block list on a freshly started driver"""
+        if not self.patterns:
+            return
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.patterns})
+        except WebDriverException as e:
+            print(f"Could not apply resource profile {self.name}: {e.msg}")
+
+    def wait_loaded(self, driver, stage: str, context) -> None:
+        """Wait until the page is as loaded as ``stage`` needs"""
+        if self.session_strategy == "normal":
+            return
+        states = READY_STATES[self.strategies.get(stage, "normal")]
+        selector = self.ready.get(stage)
+        if states is None and selector is None:
+            return
+
+        def loaded(driver):
+            return driver.execute_script(
+                "const [states, selector] = arguments;"
+                "return (!states || states.includes(document.readyState))"
+                " && (!selector || document.querySelector(selector) !== null);",
+                list(states) if states else None, selector
+            )
+
+        with metrics.timer(f"{stage}_ready", context):
+            try:
+                WebDriverWait(driver, context.remaining(self.ready_timeout), poll_frequency=0.1).until(loaded)
+            except TimeoutException:
+                # The stage reads whatever is there, as it would after a normal load
+                metrics.inc("page_ready_timeouts_total", stage=stage)
+
+    @staticmethod
+    def record_page(driver, stage: str):
+        """Count the requests and bytes the page open in ``driver`` loaded
+        before it was read (only with RESOURCE_STATS, it costs a round-trip)"""
+        if not RESOURCE_STATS:
+            return None
+        try:
+            stats = driver.execute_script(PAGE_STATS_SCRIPT)
+        except WebDriverException:
+            return None
+        metrics.inc("page_loads_total", stage=stage)
+        metrics.inc("page_requests_total", stats["requests"], stage=stage)
+        metrics.inc("page_transfer_bytes_total", stats["bytes"], stage=stage)
+        return stats
+
+
+PROFILES = {
+    # Everything loads and every navigation waits for the load event
+    "full": ResourceProfile(
+        "full",
+        strategies={"scroll": "normal", "detail": "normal"},
+    ),
+    # No images, fonts, media or beacons; pages are read as soon as their
+    # panel exists instead of after the load event
+    "minimal": ResourceProfile(
+        "minimal",
+        blocked=("image", "font", "media", "tracking"),
+        strategies={"scroll": "eager", "detail": "eager"},
+        ready={"scroll": "[role='feed']", "detail": "[role='main'] h1"},
+    ),
+}
+
+
+def get_profile(name: str) -> ResourceProfile:
+    if name not in PROFILES:
+        raise ValueError(f"Unknown resource profile {name!r}, expected one of {', '.join(PROFILES)}")
+    return PROFILES[name]
+
+
+profile = get_profile(RESOURCE_PROFILE)
@@ -1,78 +1,83 @@
-from time import sleep
+from urllib.parse import quote_plus
 from scraper.base import Base
 from scraper.scroller import Scroller
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-import tempfile
+from scraper.pool import create_driver
+from scraper.common import JobContext
+from scraper.metrics import metrics
+from config.setting import MAPS_URL
+
+
+def search_url(query: str) -> str:
+    return f"{MAPS_URL}/search/{quote_plus(query)}?hl=en"
 
 
 class Backend(Base):
-    def __init__(self, searchquery: str, outputformat: str, healdessmode: int):
+    def __init__(self, searchquery: str, outputformat: str, healdessmode: int, pool=None,
+                 context: JobContext = None, concurrency: int = 1, mode: str = "full",
+                 engine: str = "script", pipeline: bool = True):
         """Initialize the scraper backend
         Args:
             searchquery (str): Search query for Google Maps
             outputformat (str): Format of output (json)
             healdessmode (int): Whether to run in headless mode (1=headless, 0=visible)
+            pool (DriverPool): Borrow a warm driver from this pool instead of launching one
+            context (JobContext): Cancellation/deadline state shared with the scroller and parser
+            concurrency (int): Browsers used in parallel for place pages (needs a pool)
+            mode (str): "full" opens every place page, "feed" reads the result
+                cards only, "hybrid" opens place pages only for missing fields
+            engine (str): Place page extraction, "script" (in-browser) or "soup"
+            pipeline (bool): Parse place pages on pooled drivers while still scrolling
         """
         self.searchquery = searchquery
         self.headlessMode = healdessmode
-        self.init_driver()
-        self.scroller = Scroller(driver=self.driver)
+        self.pool = pool
+        self.context = context or JobContext()
+        if pool:
+            with metrics.timer("driver_acquire", self.context):
+                self.driver = pool.acquire()
+        else:
+            self.init_driver()
+        self.scroller = Scroller(
+            driver=self.driver,
+            context=self.context,
+            pool=pool,
+            concurrency=concurrency,
+            mode=mode,
+            engine=engine,
+            pipeline=pipeline
+        )
 
     def init_driver(self) -> None:
-        """Initialize the Chrome WebDriver with appropriate options"""
-        options = webdriver.ChromeOptions()
-        
-        # Headless mode with proper hardware acceleration disabled
-        if self.headlessMode == 1:
-            options.add_argument('--headless=new')
-            options.add_argument('--disable-gpu')
-            options.add_argument('--disable-software-rasterizer')
-        
-        # Essential options
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--disable-web-security')
-        options.add_argument('--allow-running-insecure-content')
-        
-        # Disable problematic features
-        options.add_argument('--disable-webgl')
-        options.add_argument('--disable-notifications')
-        options.add_argument('--disable-popup-blocking')
-        options.add_argument('--disable-infobars')
-        options.add_argument('--disable-extensions')
-        
-        # Error handling and logging
-        options.add_argument('--disable-logging')
-        options.add_argument('--log-level=3')
-        options.add_argument('--silent')
-        
-        # Performance settings
-        prefs = {
-            "profile.managed_default_content_settings.images": 2,
-            "profile.default_content_setting_values.notifications": 2,
-            "profile.managed_default_content_settings.javascript": 1,
-            "profile.managed_default_content_settings.cookies": 1,
-            "profile.managed_default_content_settings.plugins": 2,
-            "profile.managed_default_content_settings.popups": 2,
-            "profile.managed_default_content_settings.geolocation": 2,
-            "profile.managed_default_content_settings.media_stream": 2
-        }
-        options.add_experimental_option("prefs", prefs)
-        options.add_experimental_option('excludeSwitches', ['enable-logging', 'enable-automation'])
-        options.add_experimental_option('useAutomationExtension', False)
+        """Initialize a dedicated Chrome WebDriver for this backend"""
+        with metrics.timer("driver_startup", self.context):
+            self.driver = create_driver(self.headlessMode)
+
+    def search_url(self) -> str:
+        return search_url(self.searchquery)
+
+    @property
+    def links_found(self) -> int:
+        return self.scroller.links_found
 
-        # *** THIS LINE IS REQUIRED FOR RENDER ***
-        options.binary_location = "/usr/bin/chromium"
+    @property
+    def places_parsed(self) -> int:
+        return self.scroller.places_parsed
 
-        # Set driver service
-        service = Service(ChromeDriverManager().install())
+    def mainscraping(self) -> None:
+        """Open the search results and run the scroll + parse stages, or
+        only the parse stage when a checkpoint already has the whole feed"""
+        checkpoint = self.context.checkpoint
+        if checkpoint and checkpoint.scrolled:
+            self.scroller.resume(checkpoint.cards())
+        elif self.openingurl(url=self.search_url(), stage="scroll"):
+            self.scroller.scroll()
 
-        # Initialize the driver
-        self.driver = webdriver.Chrome(service=service, options=options)
-    
-    def scrape(self) -> None:
-        """Perform the scraping operation"""
-        # Your scraping logic here
-        pass
\ No newline at end of file
+    def close(self) -> None:
+        """Return the driver to its pool, or quit it when it is owned"""
+        if not getattr(self, "driver", None):
+            return
+        if self.pool:
+            self.pool.release(self.driver)
+        else:
+            self.driver.quit()
+        self.driver = None
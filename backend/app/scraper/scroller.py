@@ -1,83 +1,226 @@
 import time
-from scraper.common import Common
-from bs4 import BeautifulSoup
+from scraper.common import JobContext
 from selenium.common.exceptions import JavascriptException
 from scraper.parser import Parser
+from scraper.feed import parse_feed_cards
+from scraper.pipeline import LinkPipeline
+from scraper.metrics import metrics
+from config.setting import SCROLL_WAIT, SCROLL_MAX_STALLS, PIPELINE_QUEUE_SIZE
+
+# Scrolls the feed, then resolves as soon as unseen result anchors (or the
+# end-of-list marker) appear, or after arguments[0] ms. Harvested anchors are
+# tagged so each card's HTML crosses the wire only once.
+HARVEST_SCRIPT = """
+const timeoutMs = arguments[0];
+const done = arguments[arguments.length - 1];
+const feed = document.querySelector("[role='feed']");
+if (!feed) { done(null); return; }
+
+const harvest = () => {
+    const cards = [];
+    for (const anchor of feed.querySelectorAll("a.hfpxzc:not([data-gms-seen])")) {
+        anchor.setAttribute("data-gms-seen", "1");
+        cards.push((anchor.closest(".Nv2PK") || anchor.parentElement).outerHTML);
+    }
+    return {cards: cards, end: !!document.querySelector(".PbZDve")};
+};
+const ready = () => !!(feed.querySelector("a.hfpxzc:not([data-gms-seen])") || document.querySelector(".PbZDve"));
+
+feed.scrollTo(0, feed.scrollHeight);
+if (ready()) { done(harvest()); return; }
+
+let timer = null;
+const observer = new MutationObserver(() => { if (ready()) finish(); });
+const finish = () => { observer.disconnect(); clearTimeout(timer); done(harvest()); };
+observer.observe(feed, {childList: true, subtree: true});
+timer = setTimeout(finish, timeoutMs);
+"""
 
 class Scroller:
-    def __init__(self, driver) -> None:
+    def __init__(self, driver, context: JobContext, pool=None, concurrency: int = 1, mode: str = "full",
+                 engine: str = "script", pipeline: bool = True) -> None:
         self.driver = driver
+        self.context = context
+        self.pool = pool
+        self.concurrency = concurrency
+        self.mode = mode
+        self.engine = engine
+        self.pipeline = pipeline
         self.parser = None
         self.__allResultsLinks = []
+        self.__cards = []
+        self.steps = []  # per scroll iteration: seconds, bytes transferred, new results
+
+    @property
+    def links_found(self) -> int:
+        return len(self.__allResultsLinks)
+
+    @property
+    def cards(self) -> list:
+        return list(self.__cards)
+
+    @property
+    def places_parsed(self) -> int:
+        if not self.parser:
+            return 0
+        return self.parser.parsedCount
 
     def start_parsing(self):
-        self.parser = Parser(self.driver)
-        if self.__allResultsLinks:
-            self.parser.main(self.__allResultsLinks)
-        else:
+        self.parser = Parser(self.driver, self.context, pool=self.pool, engine=self.engine)
+        if not self.__allResultsLinks:
             print("No results links found to parse")
+        elif self.mode in ("feed", "hybrid"):
+            self.parser.from_feed(self.__cards, hybrid=self.mode == "hybrid", concurrency=self.concurrency)
+        else:
+            self.parser.main(self.__allResultsLinks, concurrency=self.concurrency)
     
+    def resume(self, cards: list):
+        """Parse the checkpointed feed of an interrupted job instead of
+        scrolling it again; places already in the record log are skipped"""
+        self.__cards = list(cards)
+        self.__allResultsLinks = [card["Google Maps URL"] for card in cards]
+        print(
+            f"Resuming from checkpoint: {len(self.context.checkpoint.done)} of "
+            f"{len(self.__allResultsLinks)} places already done"
+        )
+        self.start_parsing()
+
+    def harvest(self) -> dict:
+        """Scroll the feed once, wait for it to grow and return only the result
+        cards appended since the previous call (one WebDriver round-trip)"""
+        return self.driver.execute_async_script(
+            HARVEST_SCRIPT, int(self.context.remaining(SCROLL_WAIT) * 1000)
+        )
+
     def scroll(self):
         scrollable_element = self.driver.execute_script(
             """return document.querySelector("[role='feed']")"""
         )
-        
+
         if not scrollable_element:
             print("No results found")
             self.__allResultsLinks = []  # Ensure empty list
             return
-            
+
         print("Starting scroll")
-        last_height = 0
+        checkpoint = self.context.checkpoint
+        if checkpoint:
+            checkpoint.restart_scroll()
+        pipeline = self.open_pipeline()
+        collected = False
+        try:
+            # A feed cut short by the deadline is scrolled again on resume
+            if self.scroll_feed(pipeline) and checkpoint and not self.context.is_cancelled():
+                checkpoint.end_scroll()
+            # Past the deadline this only gathers what is already parsed
+            if pipeline and not self.context.cancelled:
+                self.parser.from_pipeline(pipeline, self.driver)
+                collected = True
+        finally:
+            if pipeline:
+                if not collected:
+                    pipeline.finish()
+                for driver in pipeline.drivers:
+                    self.pool.release(driver)
+
+        if not pipeline and not self.context.cancelled:
+            self.start_parsing()
+
+    def open_pipeline(self):
+        """Start place-page workers on idle pooled drivers so parsing runs
+        while the feed is still loading; None when pipelining is unavailable"""
+        # The http engine reads pages off the browser; it runs after the scroll
+        if not (self.pipeline and self.pool and self.mode == "full" and self.engine != "http"):
+            return None
+        # ``concurrency`` counts the job's own browser, which keeps scrolling
+        # and joins the parsing once the feed ends
+        if self.concurrency <= 1:
+            return None
+        drivers = []
+        while len(drivers) < self.concurrency - 1:
+            driver = self.pool.try_acquire()
+            if not driver:
+                break
+            drivers.append(driver)
+        if not drivers:
+            print("No idle browser for pipelined parsing, parsing after the scroll")
+            return None
+        self.parser = Parser(self.driver, self.context, pool=self.pool, engine=self.engine)
+        self.parser.browsers = len(drivers) + 1
+        return LinkPipeline(self.parser, drivers, maxsize=PIPELINE_QUEUE_SIZE)
+
+    def scroll_feed(self, pipeline=None) -> bool:
+        """Scroll until the end of the feed, handing new links to ``pipeline``.
+        Returns False when the job was cancelled"""
+        self.driver.set_script_timeout(SCROLL_WAIT + 10)
+        seen = set()
+        stalls = 0
+        limit = self.context.max_results
 
         while True:
-            if Common.close_thread_is_set():
-                return
-                
-            # Scroll to bottom
-            scrollable_element = self.driver.execute_script(
-                """return document.querySelector("[role='feed']")"""
-            )
-            self.driver.execute_script(
-                "arguments[0].scrollTo(0, arguments[0].scrollHeight);",
-                scrollable_element
-            )
-            time.sleep(2)
+            if self.context.is_cancelled():
+                return False
 
-            # Calculate new scroll height
-            new_height = self.driver.execute_script(
-                "return arguments[0].scrollHeight", 
-                scrollable_element
+            started = time.monotonic()
+            step = self.harvest()
+            if step is None:
+                print("Results feed disappeared")
+                return True
+
+            # Only cards not seen before are kept
+            new_cards = []
+            for card in (card for html in step["cards"] for card in parse_feed_cards(html)):
+                if card["Google Maps URL"] in seen:
+                    continue
+                if limit and len(self.__allResultsLinks) >= limit:
+                    self.context.truncate("max_results")
+                    break
+                seen.add(card["Google Maps URL"])
+                new_cards.append(card)
+                self.__cards.append(card)
+                self.__allResultsLinks.append(card["Google Maps URL"])
+
+            metrics.observe("scroll_step", time.monotonic() - started, self.context)
+            self.steps.append({
+                "seconds": time.monotonic() - started,
+                "bytes": sum(len(html) for html in step["cards"]),
+                "new_results": len(new_cards)
+            })
+            print(
+                f"Scroll step {len(self.steps)}: +{len(new_cards)} locations "
+                f"({len(self.__allResultsLinks)} total) in {self.steps[-1]['seconds'] * 1000:.0f} ms, "
+                f"{self.steps[-1]['bytes'] / 1024:.1f} KB"
             )
 
+            if self.context.checkpoint:
+                self.context.checkpoint.add_cards(new_cards)
+            if pipeline:
+                for card in new_cards:
+                    pipeline.put(card["Google Maps URL"])
+
             # Check if we've reached the end
-            if new_height == last_height:
-                end_element = self.driver.execute_script(
-                    "return document.querySelector('.PbZDve')"
-                )
-                
-                if end_element:
-                    break
-                    
-                try:
-                    # Try loading more results
-                    self.driver.execute_script(
-                        "array=document.getElementsByClassName('hfpxzc');"
-                        "array[array.length-1].click();"
-                    )
-                except JavascriptException:
-                    pass
-            else:
-                last_height = new_height
-                
-                # Extract links
-                soup = BeautifulSoup(scrollable_element.get_attribute('outerHTML'), 'html.parser')
-                result_links = [
-                    a.get('href') for a in soup.find_all('a', class_='hfpxzc')
-                ]
-                self.__allResultsLinks = result_links
-                print(f"Total locations found: {len(self.__allResultsLinks)}")
+            if step["end"]:
+                return True
 
-        self.start_parsing()
+            if limit and len(self.__allResultsLinks) >= limit:
+                print(f"Reached max_results ({limit}), ending scroll")
+                self.context.truncate("max_results")
+                return True
+
+            if new_cards:
+                stalls = 0
+                continue
 
+            stalls += 1
+            if stalls >= SCROLL_MAX_STALLS:
+                print("Feed stopped growing, ending scroll")
+                return True
 
+            try:
+                # Try loading more results
+                self.driver.execute_script(
+                    "array=document.getElementsByClassName('hfpxzc');"
+                    "array[array.length-1].click();"
+                )
+            except JavascriptException:
+                pass
@@ -0,0 +1,97 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from config.setting import PLACE_STORE_PATH
+
+
+class PlaceStore:
+    """SQLite store of parsed place records keyed by place id (see
+    ``scraper.feed.place_id``), each with the time it was scraped.
+
+    Parser writes every record it finishes from a place page, and serves
+    links whose record is younger than the job's ``max_age`` from here
+    instead of opening them again.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str) -> None:
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS places ("
+            " place_id TEXT PRIMARY KEY,"
+            " record TEXT NOT NULL,"
+            " scraped_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    @classmethod
+    def shared(cls):
+        """The process-wide store, or None when PLACE_STORE_PATH is empty"""
+        if not PLACE_STORE_PATH:
+            return None
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(PLACE_STORE_PATH)
+            return cls._shared
+
+    @classmethod
+    def close_shared(cls) -> None:
+        with cls._shared_lock:
+            if cls._shared is not None:
+                cls._shared.close()
+                cls._shared = None
+
+    def get(self, place_id: str, max_age: float):
+        """The stored record if it was scraped less than ``max_age`` seconds ago"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT record, scraped_at FROM places WHERE place_id = ?", (place_id,)
+            ).fetchone()
+            if row is None or time.time() - row[1] > max_age:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def get_many(self, place_ids: list, max_age: float) -> dict:
+        """``{place_id: record}`` for every fresh entry among ``place_ids``"""
+        found = {}
+        oldest = time.time() - max_age
+        with self._lock:
+            for start in range(0, len(place_ids), 500):
+                chunk = place_ids[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT place_id, record FROM places WHERE scraped_at >= ?"
+                    f" AND place_id IN ({','.join('?' * len(chunk))})",
+                    (oldest, *chunk)
+                ).fetchall()
+                found.update((place_id, json.loads(record)) for place_id, record in rows)
+            self.hits += len(found)
+            self.misses += len(set(place_ids)) - len(found)
+        return found
+
+    def put(self, place_id: str, record: dict) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO places (place_id, record, scraped_at) VALUES (?, ?, ?)",
+                (place_id, json.dumps(record), time.time())
+            )
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._db.execute("SELECT COUNT(*) FROM places").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": size}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
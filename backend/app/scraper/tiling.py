@@ -0,0 +1,122 @@
+import math
+import queue
+from urllib.parse import quote_plus
+from scraper.batch import BatchScraper
+from scraper.common import JobContext
+from config.setting import MAPS_URL, TILE_VIEWPORT_PX
+
+KM_PER_DEGREE = 111.32
+MAX_ZOOM = 21
+
+
+def bbox_around(lat: float, lng: float, radius_km: float) -> tuple:
+    """(south, west, north, east) of the square enclosing a circle"""
+    dlat = radius_km / KM_PER_DEGREE
+    dlng = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+    return lat - dlat, lng - dlng, lat + dlat, lng + dlng
+
+
+class Tile:
+    """One rectangle of a tiled search, searched as "query" at the zoom
+    whose viewport just covers it"""
+
+    def __init__(self, south: float, west: float, north: float, east: float, depth: int = 0) -> None:
+        self.south = south
+        self.west = west
+        self.north = north
+        self.east = east
+        self.depth = depth
+
+    @property
+    def center(self) -> tuple:
+        return (self.south + self.north) / 2, (self.west + self.east) / 2
+
+    @property
+    def zoom(self) -> float:
+        """The closest zoom (Maps takes fractional ones) whose viewport covers the tile"""
+        lat = self.center[0]
+        lng_span = max(self.east - self.west, (self.north - self.south) / math.cos(math.radians(lat)))
+        zoom = math.log2(360 * TILE_VIEWPORT_PX / (256 * lng_span))
+        return min(MAX_ZOOM, max(1.0, math.floor(zoom * 100) / 100))
+
+    @property
+    def label(self) -> str:
+        return f"tile {self.south:.5f},{self.west:.5f},{self.north:.5f},{self.east:.5f}"
+
+    def url(self, query: str) -> str:
+        lat, lng = self.center
+        return f"{MAPS_URL}/search/{quote_plus(query)}/@{lat:.6f},{lng:.6f},{self.zoom:g}z?hl=en"
+
+    def split(self, parts: int = 2) -> list:
+        """``parts`` x ``parts`` equal sub-tiles, one level deeper"""
+        return plan_tiles((self.south, self.west, self.north, self.east), parts, depth=self.depth + 1)
+
+
+def plan_tiles(bbox, grid: int, depth: int = 0) -> list:
+    """Cut ``bbox`` (south, west, north, east) into a ``grid`` x ``grid`` list of tiles"""
+    south, west, north, east = bbox
+    dlat = (north - south) / grid
+    dlng = (east - west) / grid
+    return [
+        Tile(south + row * dlat, west + col * dlng, south + (row + 1) * dlat, west + (col + 1) * dlng, depth)
+        for row in range(grid)
+        for col in range(grid)
+    ]
+
+
+class TiledScraper(BatchScraper):
+    """Fans one query out over map tiles to get past the results feed's cap.
+
+    Each tile is searched as its own feed over the batch's pooled browsers.
+    A tile whose feed returns ``cap`` results or more was probably cut off, so
+    it is split into ``split`` x ``split`` sub-tiles (up to ``max_depth``
+    levels) that are searched too. Places are deduplicated across tiles as in
+    a batch; their ``queries`` list the tiles that found them.
+    """
+
+    def __init__(self, query: str, tiles: list, pool, context: JobContext = None, concurrency: int = 1,
+                 mode: str = "full", engine: str = "script", cap: int = 120, max_depth: int = 2,
+                 split: int = 2) -> None:
+        super().__init__([query], pool, context=context, concurrency=concurrency, mode=mode, engine=engine)
+        # Stats are kept per tile as each one is searched, not for the query
+        self.stats = {}
+        self.query = query
+        self.tiles = tiles
+        self.cap = cap
+        self.max_depth = max_depth
+        self.split = split
+        self.subdivided = set()
+        self.depths = {}
+
+    def searches(self) -> list:
+        return [self._search(tile) for tile in self.tiles]
+
+    def _search(self, tile: Tile) -> tuple:
+        with self._lock:
+            self.depths[tile.label] = tile.depth
+        return tile.label, tile.url(self.query), tile
+
+    def scrolled(self, label: str, tile: Tile, cards: list, work: queue.Queue) -> None:
+        if len(cards) < self.cap:
+            return
+        if tile.depth >= self.max_depth:
+            print(f"{label} hit the {self.cap} result cap at the maximum depth, some places may be missing")
+            return
+        children = tile.split(self.split)
+        with self._lock:
+            self.subdivided.add(label)
+        print(f"{label} hit the {self.cap} result cap, splitting it into {len(children)} tiles")
+        for child in children:
+            work.put(self._search(child))
+
+    def tile_stats(self) -> list:
+        return [
+            {
+                "tile": stats["query"],
+                "depth": self.depths.get(stats["query"], 0),
+                "links_found": stats["links_found"],
+                "new_places": stats["new_places"],
+                "subdivided": stats["query"] in self.subdivided,
+            }
+            for stats in self.query_stats()
+        ]
@@ -0,0 +1,145 @@
+"""Standalone worker that runs jobs from the durable job queue.
+
+Start any number of these, on this host or others sharing QUEUE_PATH and
+CHECKPOINT_DIR, next to an API server started with the same QUEUE_PATH:
+
+    cd backend
+    QUEUE_PATH=data/queue.sqlite3 python app/worker.py [--concurrency 2] [--browsers 2]
+"""
+import argparse
+import os
+import signal
+import socket
+import threading
+from jobs import JobManager
+from jobqueue import JobQueue
+from scraper.pool import DriverPool
+from scraper.enrichment import EmailEnricher
+from scraper.fetch import PlaceFetcher
+from scraper.store import PlaceStore
+from config.setting import (
+    HEADLESS, DRIVER_POOL_SIZE, DRIVER_LEASE_TIMEOUT, WORKER_CONCURRENCY, QUEUE_POLL_INTERVAL
+)
+
+
+class Worker:
+    """Leases up to ``concurrency`` jobs at a time from a JobQueue and runs
+    them on its own browser pool through a JobManager.
+
+    Every poll it checks in with the queue, extends the lease of each job it
+    is running and stops the ones that were cancelled or whose lease it
+    lost. Jobs that raise are handed back to be retried. On ``stop`` the
+    running jobs are cancelled and queued again; their checkpoints let the
+    next worker continue where this one left off.
+    """
+
+    def __init__(self, queue: JobQueue, pool, concurrency: int = WORKER_CONCURRENCY, headless: int = HEADLESS,
+                 worker_id: str = None, poll_interval: float = QUEUE_POLL_INTERVAL) -> None:
+        self.queue = queue
+        self.host = socket.gethostname()
+        self.id = worker_id or f"{self.host}-{os.getpid()}"
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        # Results are read back from the checkpoints by the API, so they are kept
+        self.jobs = JobManager(pool, workers=concurrency, queue_size=0, history=0, headless=headless,
+                               remove_checkpoints=False)
+        self.running = {}
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run(self) -> None:
+        """Lease and run jobs until ``stop`` is called"""
+        print(f"Worker {self.id} running up to {self.concurrency} queued jobs")
+        try:
+            while not self._stop.is_set():
+                try:
+                    self.poll()
+                except Exception as e:
+                    # e.g. the queue database is briefly locked or unreachable
+                    print(f"Error polling the job queue: {str(e)}")
+                self._stop.wait(self.poll_interval)
+        finally:
+            self.shutdown()
+
+    def poll(self) -> None:
+        self.queue.beat(self.id, self.host, os.getpid(), self.concurrency, len(self.running))
+        for job_id, job in list(self.running.items()):
+            if job.future.done():
+                self.report(job)
+                del self.running[job_id]
+                continue
+            status = job.to_status()
+            if not self.queue.heartbeat(job_id, self.id, status.links_found, status.places_parsed):
+                job.context.cancel()
+
+        while len(self.running) < self.concurrency and not self._stop.is_set():
+            queued = self.queue.lease(self.id)
+            if queued is None:
+                break
+            print(f"Worker {self.id} running job {queued.id} (attempt {queued.attempts}): {queued.query}")
+            try:
+                self.running[queued.id] = self.jobs.submit(queued.search, job_id=queued.id, checkpoint=True)
+            except Exception as e:
+                self.queue.release(queued.id, self.id, error=str(e))
+
+    def report(self, job) -> None:
+        """Hand a finished job's outcome to the queue"""
+        status = job.to_status()
+        if job.status == "failed":
+            self.queue.release(job.id, self.id, error=job.error)
+        elif job.status == "cancelled" and self._stop.is_set():
+            # Stopped by our own shutdown, not by the user
+            self.queue.release(job.id, self.id)
+        else:
+            result = None
+            if job.result is not None:
+                # The API reads the locations back from the checkpoint
+                result = job.result.model_dump(exclude={"locations"} if job.checkpoint else None)
+            self.queue.finish(job.id, self.id, job.status, result=result,
+                              links_found=status.links_found, places_parsed=status.places_parsed)
+
+    def shutdown(self) -> None:
+        """Cancel the running jobs and queue them again"""
+        for job in self.running.values():
+            job.context.cancel()
+        for job in self.running.values():
+            try:
+                job.future.exception()
+            except Exception:
+                pass
+            self.report(job)
+        self.running.clear()
+        self.jobs.shutdown()
+        self.queue.beat(self.id, self.host, os.getpid(), self.concurrency, 0, stopped=True)
+        print(f"Worker {self.id} stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY, help="jobs run at once")
+    parser.add_argument("--browsers", type=int, default=DRIVER_POOL_SIZE, help="pooled browsers of this worker")
+    parser.add_argument("--id", help="worker name shown by GET /workers (default: host-pid)")
+    args = parser.parse_args()
+
+    queue = JobQueue.shared()
+    if queue is None:
+        raise SystemExit("QUEUE_PATH is not set; point it at the API server's job queue")
+    pool = DriverPool(size=args.browsers, headless=HEADLESS, lease_timeout=DRIVER_LEASE_TIMEOUT)
+    pool.start()
+    worker = Worker(queue, pool, concurrency=args.concurrency, worker_id=args.id)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+    try:
+        worker.run()
+    finally:
+        EmailEnricher.close_shared()
+        PlaceFetcher.close_shared()
+        PlaceStore.close_shared()
+        pool.close()
+        JobQueue.close_shared()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Benchmark email extraction on the saved website pages.
+
+Runs ``scraper.emails.emails_in`` and the regex scan the lookup used
+before (``verify_emails.legacy_emails``) over every page in
+``fixtures/emails`` ``--repeat`` times and reports the time per page, the
+throughput and how many addresses each returns. ``--scale`` repeats the
+body of every page that many times first, to see how both hold up on
+multi-megabyte pages.
+
+    cd backend
+    python bench/bench_emails.py [--repeat 50] [--scale 1]
+"""
+import argparse
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app"))
+
+from scraper.emails import emails_in  # noqa: E402
+from verify_emails import legacy_emails, load_pages  # noqa: E402
+
+
+def timed(extract, page: str, repeat: int) -> tuple:
+    """Seconds per call, and the addresses of the last call"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        emails = extract(page)
+    return (time.perf_counter() - started) / repeat, emails
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50, help="runs per page and extractor")
+    parser.add_argument("--scale", type=int, default=1, help="copies of each page's body")
+    args = parser.parse_args()
+
+    extractors = {"extractor": emails_in, "legacy": legacy_emails}
+    totals = {name: 0.0 for name in extractors}
+    size = 0
+    print(f"{'page':<20} {'KB':>7}  " + "  ".join(f"{name + ' ms':>12} {'found':>5}" for name in extractors))
+    for name, page, _ in load_pages():
+        if args.scale > 1:
+            head, _, body = page.partition("<body")
+            page = head + ("<body" + body) * args.scale
+        size += len(page)
+        row = []
+        for extractor, extract in extractors.items():
+            seconds, emails = timed(extract, page, args.repeat)
+            totals[extractor] += seconds
+            row.append(f"{seconds * 1000:12.2f} {len(emails):5d}")
+        print(f"{name:<20} {len(page) / 1024:7.0f}  " + "  ".join(row))
+
+    for extractor, seconds in totals.items():
+        print(f"{extractor:<10} {size / seconds / 1024 / 1024:8.1f} MB/s  {seconds * 1000:8.2f} ms per pass over the corpus")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Compare the http place-page engine with the browser engines offline.
+
+Every place of one stand-in query is read with the http engine, which
+fetches the pages without a browser and leaves every tenth place (the
+stand-in serves those without embedded data) to the browser. Without
+``--browser`` only the HTTP half runs and those places are counted as
+fallbacks. With ``--browser`` the same links are also parsed by
+``Parser.main`` with each of ``--engines`` on pooled Chromium, so the
+places/sec and accuracy of the engines can be compared directly.
+
+    cd backend
+    python bench/compare_engines.py [--results 100] [--browser] [--concurrency 2]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app"))
+
+from standin import StandIn  # noqa: E402
+from run import QUERY, accuracy, percentile  # noqa: E402
+
+
+def bench_fetch(links, expected, workers: int) -> dict:
+    """The http engine's fetch and parse alone, without the browser fallback"""
+    from scraper.fetch import PlaceFetcher
+    from scraper.common import JobContext
+
+    fetcher = PlaceFetcher(max_workers=workers)
+    context = JobContext()
+    latencies = []
+
+    def fetch(link):
+        started = time.monotonic()
+        try:
+            return fetcher.fetch(link, context)
+        finally:
+            latencies.append(time.monotonic() - started)
+
+    try:
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            records = list(executor.map(fetch, links))
+        elapsed = time.monotonic() - started
+    finally:
+        fetcher.close()
+    parsed = [record for record in records if record]
+    return {
+        "seconds": elapsed,
+        "places_per_sec": len(parsed) / elapsed if elapsed else None,
+        "page_p50_ms": (percentile(latencies, 50) or 0) * 1000,
+        "page_p95_ms": (percentile(latencies, 95) or 0) * 1000,
+        "fallbacks": len(records) - len(parsed),
+        "accuracy": accuracy(parsed, expected),
+    }
+
+
+def bench_engine(pool, links, expected, engine: str, concurrency: int) -> dict:
+    """``Parser.main`` over the links, browser fallback included"""
+    from scraper.parser import Parser
+    from scraper.common import JobContext
+    from scraper.metrics import metrics
+
+    fallbacks = metrics.value("place_fetch_fallbacks_total")
+    with pool.lease() as driver:
+        parser = Parser(driver, JobContext(), pool=pool, engine=engine)
+        started = time.monotonic()
+        parser.main(links, concurrency=concurrency)
+        elapsed = time.monotonic() - started
+    return {
+        "seconds": elapsed,
+        "places_per_sec": len(parser.finalData) / elapsed if elapsed else None,
+        "fallbacks": metrics.value("place_fetch_fallbacks_total") - fallbacks,
+        "accuracy": accuracy(parser.finalData, expected),
+    }
+
+
+def report(name: str, run: dict) -> None:
+    accuracy_ = run["accuracy"]
+    print(
+        f"{name:<12} {run['seconds']:7.2f}s  {run['places_per_sec'] or 0:8.1f} places/sec  "
+        f"{run['fallbacks']:3d} fallbacks  {accuracy_['records']}/{accuracy_['expected']} records, "
+        f"{accuracy_['fields_exact'] * 100:.0f}% exact"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--results", type=int, default=100, help="places in the query")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent HTTP fetches")
+    parser.add_argument("--browser", action="store_true", help="also parse the places in Chromium")
+    parser.add_argument("--engines", nargs="+", default=["http", "script"], choices=["http", "script", "soup"])
+    parser.add_argument("--concurrency", type=int, default=2, help="browsers for the browser engines")
+    parser.add_argument("--headless", type=int, default=1)
+    args = parser.parse_args()
+
+    standin = StandIn(results=args.results, sites=0)
+    os.environ["MAPS_URL"] = standin.maps_url
+    os.environ["HEADLESS"] = str(args.headless)
+    os.environ["PLACE_HTTP_WORKERS"] = str(args.workers)
+    # Every place must be read, not served from earlier runs
+    os.environ["PLACE_STORE_PATH"] = ""
+    os.environ["EMAIL_CACHE_PATH"] = ""
+
+    expected = standin.expected(QUERY)
+    links = [record["Google Maps URL"] for record in expected]
+    pool = None
+    try:
+        report("http fetch", bench_fetch(links, expected, args.workers))
+        if args.browser:
+            from scraper.pool import DriverPool
+            pool = DriverPool(size=args.concurrency, headless=args.headless)
+            pool.start()
+            for engine in args.engines:
+                report(engine, bench_engine(pool, links, expected, engine, args.concurrency))
+    finally:
+        if pool:
+            pool.close()
+        standin.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""Offline scraper benchmark against the local Maps stand-in.
+
+Drives ``Scroller.scroll_feed``, ``Parser.main`` and the full ``/scrape``
+route for each requested result count and reports places/sec, p50/p95
+per-page latency, WebDriver round-trips, peak RSS of the process tree and
+extraction accuracy against the stand-in's catalogue. Results are written
+as JSON; ``--compare`` prints the change against an earlier run, including
+the requests and bytes saved per page and whether the extracted records are
+identical (e.g. between two ``--profile`` runs).
+
+    cd backend
+    python bench/run.py --results 20 100 --concurrency 1 4
+    python bench/run.py --results 100 --compare bench/results/<earlier>.json
+    python bench/run.py --profile full --output full.json
+    python bench/run.py --profile minimal --compare full.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app"))
+
+from standin import StandIn  # noqa: E402
+
+try:
+    import psutil
+except ImportError:  # peak RSS then only covers this Python process
+    psutil = None
+
+QUERY = "paper cups in jaipur"
+COMPARED_FIELDS = ("Name", "Category", "Phone", "Website", "Business Status", "Address", "Total Reviews", "Rating")
+
+
+class RoundTrips:
+    """Counts WebDriver commands by wrapping ``WebDriver.execute``"""
+
+    def __init__(self) -> None:
+        from selenium.webdriver.remote.webdriver import WebDriver
+        self.count = 0
+        self._lock = threading.Lock()
+        original = WebDriver.execute
+
+        def execute(driver, *args, **kwargs):
+            with self._lock:
+                self.count += 1
+            return original(driver, *args, **kwargs)
+
+        WebDriver.execute = execute
+
+    def take(self) -> int:
+        with self._lock:
+            count, self.count = self.count, 0
+        return count
+
+
+class PeakRSS:
+    """Samples the RSS of this process and all its children (Chromium included)"""
+
+    def __init__(self, interval: float = 0.2) -> None:
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def sample(self) -> int:
+        if psutil is None:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        root = psutil.Process()
+        total = 0
+        for process in [root] + root.children(recursive=True):
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.sample())
+
+    def __enter__(self):
+        self.peak = self.sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.sample())
+
+
+def percentile(values: list, q: float):
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(q) - 1]
+
+
+def accuracy(records: list, expected: list) -> dict:
+    by_name = {record["Name"]: record for record in expected}
+    fields = emails = 0
+    for record in records:
+        want = by_name.get(record.get("Name"))
+        if want is None:
+            continue
+        fields += all(record.get(field) == want[field] for field in COMPARED_FIELDS)
+        emails += record.get("email") == want["email"]
+    total = len(expected) or 1
+    return {
+        "records": len(records),
+        "expected": len(expected),
+        "fields_exact": fields / total,
+        "emails_exact": emails / total,
+    }
+
+
+def digest(records: list) -> str:
+    """Fingerprint of the extracted fields, comparable across runs and profiles"""
+    rows = sorted(
+        json.dumps({field: record.get(field) for field in COMPARED_FIELDS}, sort_keys=True)
+        for record in records
+    )
+    return hashlib.sha1("\n".join(rows).encode()).hexdigest()
+
+
+def page_stats(stage: str, before: dict = None) -> dict:
+    """Requests and bytes per page from the RESOURCE_STATS counters"""
+    from scraper.metrics import metrics
+    totals = {
+        key: metrics.value(f"page_{key}_total", stage=stage)
+        for key in ("loads", "requests", "transfer_bytes")
+    }
+    if before is None:
+        return totals
+    loads = totals["loads"] - before["loads"]
+    return {
+        "pages": loads,
+        "requests_per_page": (totals["requests"] - before["requests"]) / loads if loads else None,
+        "bytes_per_page": (totals["transfer_bytes"] - before["transfer_bytes"]) / loads if loads else None,
+    }
+
+
+def bench_scroll(driver, standin, round_trips) -> tuple:
+    from scraper.scroller import Scroller
+    from scraper.parser import Parser
+    from scraper.common import JobContext
+
+    context = JobContext()
+    scroller = Scroller(driver, context, mode="feed")
+    url = f"{standin.maps_url}/search/{QUERY.replace(' ', '+')}?hl=en"
+    round_trips.take()
+    pages = page_stats("scroll")
+    started = time.monotonic()
+    Parser(driver, context).openingurl(url, stage="scroll")
+    scroller.scroll_feed()
+    elapsed = time.monotonic() - started
+    links = [card["Google Maps URL"] for card in scroller.cards]
+    return links, {
+        "seconds": elapsed,
+        "links": len(links),
+        "steps": len(scroller.steps),
+        "bytes": sum(step["bytes"] for step in scroller.steps),
+        "step_p50_ms": (percentile([step["seconds"] for step in scroller.steps], 50) or 0) * 1000,
+        "step_p95_ms": (percentile([step["seconds"] for step in scroller.steps], 95) or 0) * 1000,
+        "round_trips": round_trips.take(),
+        "page": page_stats("scroll", pages),
+    }
+
+
+def bench_parse(driver, pool, links, expected, args, round_trips) -> dict:
+    from scraper.parser import Parser
+    from scraper.common import JobContext
+
+    latencies = []
+    original = Parser.parse_link
+
+    def timed(self, *a, **kw):
+        started = time.monotonic()
+        try:
+            return original(self, *a, **kw)
+        finally:
+            latencies.append(time.monotonic() - started)
+
+    Parser.parse_link = timed
+    try:
+        parser = Parser(driver, JobContext(refresh_emails=True), pool=pool, engine=args.engine)
+        round_trips.take()
+        pages = page_stats("detail")
+        started = time.monotonic()
+        parser.main(links, concurrency=args.concurrency)
+        elapsed = time.monotonic() - started
+    finally:
+        Parser.parse_link = original
+
+    return {
+        "seconds": elapsed,
+        "places_per_sec": len(parser.finalData) / elapsed if elapsed else None,
+        "page_p50_ms": (percentile(latencies, 50) or 0) * 1000,
+        "page_p95_ms": (percentile(latencies, 95) or 0) * 1000,
+        "browsers": parser.browsers,
+        "round_trips": round_trips.take(),
+        "page": page_stats("detail", pages),
+        "accuracy": accuracy(parser.finalData, expected),
+        "digest": digest(parser.finalData),
+    }
+
+
+def bench_route(client, expected, args, round_trips) -> dict:
+    round_trips.take()
+    started = time.monotonic()
+    response = client.post("/scrape", json={
+        "query": QUERY,
+        "concurrency": args.concurrency,
+        "engine": args.engine,
+        "mode": args.mode,
+        "refresh_email_cache": True,
+    })
+    elapsed = time.monotonic() - started
+    response.raise_for_status()
+    locations = response.json()["locations"]
+    records = [{
+        "Name": item["name"], "Category": item["category"], "Phone": item["phone"],
+        "Website": item["website"], "Business Status": item["business_status"],
+        "Address": item["address"], "Total Reviews": item["total_reviews"],
+        "Rating": item["rating"], "email": item["email"],
+    } for item in locations]
+    return {
+        "seconds": elapsed,
+        "places_per_sec": len(locations) / elapsed if elapsed else None,
+        "round_trips": round_trips.take(),
+        "accuracy": accuracy(records, expected),
+    }
+
+
+def compare(current: dict, previous_path: str) -> None:
+    with open(previous_path, encoding="utf-8") as f:
+        previous = json.load(f)
+    old_runs = {run["results"]: run for run in previous["runs"]}
+    for run in current["runs"]:
+        old = old_runs.get(run["results"])
+        if not old:
+            continue
+        print(f"\n{run['results']} results vs {os.path.basename(previous_path)}:")
+        for stage in ("scroll", "parse", "route"):
+            if stage in run and stage in old:
+                before, after = old[stage]["seconds"], run[stage]["seconds"]
+                change = (after - before) / before * 100 if before else 0
+                print(f"  {stage:<7} {before:8.2f}s -> {after:8.2f}s ({change:+.1f}%)")
+        for stage in ("scroll", "parse"):
+            old_page, new_page = old.get(stage, {}).get("page"), run.get(stage, {}).get("page")
+            if old_page and new_page and old_page.get("pages") and new_page.get("pages"):
+                print(
+                    f"  {stage:<7} saved {old_page['requests_per_page'] - new_page['requests_per_page']:.1f} requests, "
+                    f"{(old_page['bytes_per_page'] - new_page['bytes_per_page']) / 1024:.1f} KB per page"
+                )
+        if "parse" in run and "parse" in old:
+            same = run["parse"]["digest"] == old["parse"]["digest"]
+            print(f"  extraction {'identical' if same else 'DIFFERS'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scraper against a local Maps stand-in")
+    parser.add_argument("--results", type=int, nargs="+", default=[20, 50], help="places per query")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--engine", choices=["script", "soup", "http"], default="script")
+    parser.add_argument("--mode", choices=["full", "feed", "hybrid"], default="full", help="mode for the route stage")
+    parser.add_argument("--stages", nargs="+", choices=["scroll", "parse", "route"], default=["scroll", "parse", "route"])
+    parser.add_argument("--delay", type=float, default=0.3, help="stand-in feed batch delay in seconds")
+    parser.add_argument("--headless", type=int, default=1)
+    parser.add_argument("--profile", default="full", help="RESOURCE_PROFILE to run with")
+    parser.add_argument("--output", help="JSON file to write (default: bench/results/bench-<time>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    standin = StandIn(results=max(args.results), delay=args.delay)
+
+    # The app reads its settings at import time
+    os.environ["MAPS_URL"] = standin.maps_url
+    os.environ["HEADLESS"] = str(args.headless)
+    os.environ["RESOURCE_PROFILE"] = args.profile
+    os.environ["RESOURCE_STATS"] = "1"
+    os.environ["DRIVER_POOL_SIZE"] = str(args.concurrency + 1)
+    os.environ["EMAIL_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "email_cache.sqlite3")
+    # Every run must open the pages it measures
+    os.environ["PLACE_STORE_PATH"] = ""
+
+    from scraper.pool import DriverPool
+
+    round_trips = RoundTrips()
+    report = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "runs": [],
+    }
+
+    pool = None
+    client = None
+    try:
+        if "scroll" in args.stages or "parse" in args.stages:
+            pool = DriverPool(size=args.concurrency, headless=args.headless)
+            pool.start()
+        if "route" in args.stages:
+            from fastapi.testclient import TestClient
+            import main as api
+            client = TestClient(api.app)
+            client.__enter__()
+
+        for results in args.results:
+            standin.catalogue.results = results
+            expected = standin.expected(QUERY)
+            run = {"results": results}
+            with PeakRSS() as rss:
+                if pool:
+                    driver = pool.acquire()
+                    try:
+                        links, run["scroll"] = bench_scroll(driver, standin, round_trips)
+                        if "parse" in args.stages:
+                            run["parse"] = bench_parse(driver, pool, links, expected, args, round_trips)
+                    finally:
+                        pool.release(driver)
+                if client:
+                    run["route"] = bench_route(client, expected, args, round_trips)
+            run["peak_rss_mb"] = rss.peak / 1024 / 1024
+            report["runs"].append(run)
+            print(json.dumps(run, indent=2))
+    finally:
+        if client:
+            client.__exit__(None, None, None)
+        if pool:
+            pool.close()
+        standin.stop()
+
+    output = args.output or os.path.join(BENCH_DIR, "results", f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
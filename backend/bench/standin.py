@@ -0,0 +1,389 @@
+"""Local stand-in for Google Maps and the business websites behind it.
+
+Serves a results page whose ``[role='feed']`` lazily appends ``a.hfpxzc``
+cards while it is scrolled and ends with the ``.PbZDve`` marker, place pages
+carrying the selectors Parser reads and the embedded place data the http
+engine reads (left out for every tenth place, which must then be opened in
+the browser), the recorded server responses in ``fixtures/server`` under
+``/maps/place/fixture/<name>``, and small business websites (one port per
+"host") for the email lookup. Every page is generated from a
+deterministic catalogue, so the harness knows the expected record of each
+place.
+
+    cd backend
+    python bench/standin.py --results 100 --port 8900
+    MAPS_URL=http://127.0.0.1:8900/maps python app/main.py
+"""
+import argparse
+import html
+import json
+import math
+import os
+import random
+import re
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, unquote_plus
+
+SERVER_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "server")
+
+CATEGORIES = ["Paper cup manufacturer", "Packaging supply store", "Restaurant", "Cafe", "Hardware store"]
+STREETS = ["MI Road", "Tonk Road", "JLN Marg", "Ajmer Road", "Sikar Road"]
+STATUSES = ["Open", "Closed", "Temporarily closed"]
+
+# Every place lies in this (south, west, north, east) box
+AREA = (26.80, 75.70, 27.00, 75.90)
+VIEWPORT = re.compile(r"/@(-?[\d.]+),(-?[\d.]+),([\d.]+)z")
+
+# Sub-resources a real place page pulls but Parser never reads
+HEAVY_ASSETS = {
+    "/assets/tile.png": ("image/png", 48 * 1024),
+    "/assets/font.woff2": ("font/woff2", 32 * 1024),
+    "/assets/analytics.js": ("application/javascript", 24 * 1024),
+    "/assets/promo.mp4": ("video/mp4", 96 * 1024),
+}
+
+RESULTS_PAGE = """<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>{title} - Google Maps</title>
+<style>[role=feed]{{height:600px;overflow-y:scroll}} .Nv2PK{{height:120px}}</style></head>
+<body>
+<div role="feed" aria-label="Results for {title}"></div>
+<script>
+const cards = {cards};
+const batch = {batch}, delay = {delay};
+const feed = document.querySelector("[role='feed']");
+let shown = 0, loading = false;
+function more() {{
+    for (const card of cards.slice(shown, shown + batch)) feed.insertAdjacentHTML("beforeend", card);
+    shown = Math.min(shown + batch, cards.length);
+    if (shown >= cards.length && !document.querySelector(".PbZDve"))
+        feed.insertAdjacentHTML("beforeend", '<div class="PbZDve"><span>You\\'ve reached the end of the list.</span></div>');
+    loading = false;
+}}
+feed.addEventListener("scroll", () => {{
+    if (loading || shown >= cards.length) return;
+    if (feed.scrollTop + feed.clientHeight >= feed.scrollHeight - 50) {{ loading = true; setTimeout(more, delay); }}
+}});
+more();
+</script>
+</body></html>
+"""
+
+CARD = """<div class="Nv2PK"><a class="hfpxzc" aria-label="{name}" href="{href}"></a>
+<div class="qBF1Pd">{name}</div>
+<span class="ZkP5Je"><span class="MW4etd">{rating}</span><span class="UY7F9">{reviews}</span></span>
+<div class="W4Efsd"><div class="W4Efsd"><span><span>{category}</span></span><span> · </span><span><span>{street}</span></span></div>
+<div class="W4Efsd"><span><span>{status}</span></span></div></div></div>"""
+
+PLACE_PAGE = """<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>{name} - Google Maps</title>
+<meta itemprop="name" content="{name} · {address}">
+<meta property="og:title" content="{name} · {address}">
+<meta property="og:description" content="★★★★☆ · {category}">
+<link rel="stylesheet" href="/assets/font.woff2">
+<script src="/assets/analytics.js"></script>{state_script}</head>
+<body>
+<img src="/assets/tile.png" alt=""><video src="/assets/promo.mp4"></video>
+<div role="main" aria-label="{name}">
+  <div class="tAiQdd"><h1 class="DUwDvf lfPIob"> {name} </h1>
+    <div class="F7nice"><span><span aria-hidden="true">{rating}</span><span class="ceNzKf" role="img" aria-label="{rating} stars "></span></span><span><span><span aria-label="reviews">{reviews}</span></span></span></div>
+    <div class="skqShb"><button class="DkEaL">{category}</button></div>
+  </div>
+  <span class="ZDu9vd"><span><span>{status}</span></span></span>
+  <div class="t39EBf"><table><tr><td>Monday</td><td>9 am–7 pm</td></tr></table></div>
+  <button class="CsEnBe" data-tooltip="Copy address"><div class="rogA2c"><div class="Io6YTe">{address}</div></div></button>
+  {website_link}
+  <button class="CsEnBe" data-tooltip="Copy phone number"><div class="rogA2c"><div class="Io6YTe">{phone}</div></div></button>
+</div>
+</body></html>
+"""
+
+STATE_SCRIPT = """<script>window.APP_INITIALIZATION_STATE={state};window.APP_FLAGS=[];</script>"""
+
+WEBSITE = """<a class="CsEnBe" aria-label="Website: {host}" href="{url}" data-tooltip="Open website"><div class="rogA2c">{host}</div></a>"""
+
+
+class Catalogue:
+    """Deterministic set of fake places; each query sees a stable sample"""
+
+    def __init__(self, results: int, universe: int = None, site_ports: list = None) -> None:
+        self.results = results
+        self.universe = universe or results * 3
+        self.site_ports = site_ports or []
+
+    def place(self, place_id: int) -> dict:
+        rnd = random.Random(place_id)
+        website = None
+        if self.site_ports and place_id % 4 != 3:
+            website = f"http://127.0.0.1:{self.site_ports[place_id % len(self.site_ports)]}/biz{place_id}/"
+        return {
+            "id": place_id,
+            "hex": f"0x{place_id + 0x39db0000:x}:0x{rnd.getrandbits(48):x}",
+            "lat": AREA[0] + (AREA[2] - AREA[0]) * rnd.random(),
+            "lng": AREA[1] + (AREA[3] - AREA[1]) * rnd.random(),
+            "name": f"Bench Place {place_id}",
+            "category": CATEGORIES[place_id % len(CATEGORIES)],
+            "address": f"{place_id} {STREETS[place_id % len(STREETS)]}, Jaipur",
+            "street": STREETS[place_id % len(STREETS)],
+            "phone": f"0141 {place_id:06d}",
+            "rating": f"{rnd.randint(30, 50) / 10:.1f}",
+            "reviews": f"({rnd.randint(1, 5000):,})",
+            "status": STATUSES[place_id % len(STATUSES)] if place_id % 5 == 0 else "Open",
+            "website": website,
+            "email": self.email(place_id) if website else None,
+        }
+
+    @staticmethod
+    def email(place_id: int):
+        """Homepage email for even ids, contact-page email for ids = 1 mod 3"""
+        if place_id % 2 == 0 or place_id % 3 == 1:
+            return f"contact{place_id}@bench{place_id}.test"
+        return None
+
+    def search(self, query: str) -> list:
+        return sorted(random.Random(query).sample(range(self.universe), min(self.results, self.universe)))
+
+    def href(self, base: str, place: dict) -> str:
+        return (
+            f"{base}/maps/place/{place['name'].replace(' ', '+')}/data=!4m7!3m6!1s{place['hex']}"
+            f"!8m2!3d{place['lat']:.7f}!4d{place['lng']:.7f}"
+        )
+
+    def within(self, south: float, west: float, north: float, east: float) -> list:
+        """Ids of every place inside the box"""
+        return [
+            place["id"] for place in map(self.place, range(self.universe))
+            if south <= place["lat"] <= north and west <= place["lng"] <= east
+        ]
+
+    @staticmethod
+    def state(place: dict):
+        """APP_INITIALIZATION_STATE for ``place``, laid out the way
+        scraper.extract.place_state reads it; None for every tenth place"""
+        if place["id"] % 10 == 9:
+            return None
+        data = [None] * 179
+        data[4] = [None] * 7 + [float(place["rating"]), int(place["reviews"].strip("()").replace(",", ""))]
+        if place["website"]:
+            data[7] = [place["website"], urlsplit(place["website"]).netloc]
+        data[9] = [None, None, place["lat"], place["lng"]]
+        data[10] = place["hex"]
+        data[11] = place["name"]
+        data[13] = [place["category"]]
+        data[34] = [None, [["Monday", ["9 am–7 pm"]]], None, None, [None, None, None, None, place["status"]]]
+        data[39] = place["address"]
+        data[178] = [[place["phone"]]]
+        return [None, None, None, [None] * 6 + [")]}'\n" + json.dumps([None] * 6 + [data])]]
+
+    def expected(self, place: dict, maps_url: str = None) -> dict:
+        """The record Parser should produce for ``place``"""
+        return {
+            "Category": place["category"],
+            "Name": place["name"],
+            "Phone": place["phone"],
+            "Google Maps URL": maps_url,
+            "Website": place["website"],
+            "email": place["email"],
+            "Business Status": place["status"],
+            "Address": place["address"],
+            "Total Reviews": place["reviews"],
+            "Booking Links": None,
+            "Rating": place["rating"],
+            "Hours": "Monday9 am–7 pm",
+        }
+
+
+class _MapsHandler(BaseHTTPRequestHandler):
+    standin = None
+
+    def log_message(self, *args):
+        pass
+
+    def send(self, body, content_type="text/html; charset=utf-8", status=200):
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        standin = self.standin
+        parts = urlsplit(self.path)
+        path = unquote_plus(parts.path)
+        standin.count(parts.path)
+
+        if parts.path in HEAVY_ASSETS:
+            content_type, size = HEAVY_ASSETS[parts.path]
+            return self.send(b"\0" * size, content_type)
+
+        if path.startswith("/maps/search/"):
+            query = path[len("/maps/search/"):].split("/@")[0]
+            cards = [standin.card(place) for place in standin.search(query, path, parse_qs(parts.query))]
+            return self.send(RESULTS_PAGE.format(
+                title=html.escape(query),
+                cards=json.dumps(cards),
+                batch=standin.batch,
+                delay=int(standin.delay * 1000)
+            ))
+
+        if path.startswith("/maps/place/fixture/"):
+            name = os.path.basename(path)
+            try:
+                with open(os.path.join(SERVER_FIXTURES, f"{name}.html"), encoding="utf-8") as f:
+                    return self.send(f.read())
+            except FileNotFoundError:
+                return self.send("Not found", status=404)
+
+        if path.startswith("/maps/place/"):
+            place = standin.place_from_path(self.path)
+            if place is None:
+                return self.send("Not found", status=404)
+            website = ""
+            if place["website"]:
+                website = WEBSITE.format(host=urlsplit(place["website"]).netloc, url=place["website"])
+            state = standin.catalogue.state(place)
+            state_script = STATE_SCRIPT.format(state=json.dumps(state).replace("</", "<\\/")) if state else ""
+            return self.send(PLACE_PAGE.format(website_link=website, state_script=state_script, **{
+                key: html.escape(value) if isinstance(value, str) else value for key, value in place.items()
+            }))
+
+        self.send("Not found", status=404)
+
+
+class _SiteHandler(BaseHTTPRequestHandler):
+    standin = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        segments = [segment for segment in urlsplit(self.path).path.split("/") if segment]
+        if not segments or not segments[0].startswith("biz"):
+            self.send_error(404)
+            return
+        place_id = int(segments[0][3:])
+        email = Catalogue.email(place_id)
+        filler = "<p>" + "Quality products since 1998. " * 40 + "</p>"
+        if len(segments) == 1:
+            body = (
+                f"<html><body><nav><a href='about'>About us</a> <a href='contact'>Contact</a></nav>"
+                f"<h1>Business {place_id}</h1>{filler}<img src='logo@2x.png'>"
+            )
+            if email and place_id % 2 == 0:
+                body += f"<p>Write to {email}</p>"
+            body += "</body></html>"
+        elif segments[1] == "contact" and email and place_id % 2:
+            body = f"<html><body><a href='mailto:{email}'>{email}</a></body></html>"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StandIn:
+    """Runs the Maps stand-in and the business websites on background threads"""
+
+    def __init__(self, results: int = 50, port: int = 0, sites: int = 4, batch: int = 7, delay: float = 0.3,
+                 universe: int = None, viewport_px: int = 600) -> None:
+        self.batch = batch
+        self.viewport_px = viewport_px
+        self.delay = delay
+        self.hits = {}
+        self._hits_lock = threading.Lock()
+        self._servers = []
+        maps = self._serve(port, _MapsHandler)
+        self.base_url = f"http://127.0.0.1:{maps.server_address[1]}"
+        site_ports = [self._serve(0, _SiteHandler).server_address[1] for _ in range(sites)]
+        self.catalogue = Catalogue(results, universe=universe, site_ports=site_ports)
+
+    @property
+    def maps_url(self) -> str:
+        """Value for the MAPS_URL setting"""
+        return f"{self.base_url}/maps"
+
+    def _serve(self, port, handler):
+        handler = type(handler.__name__, (handler,), {"standin": self})
+        server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self._servers.append(server)
+        return server
+
+    def count(self, path: str) -> None:
+        """Tally requests per kind ("search", "place", "assets")"""
+        kind = path.split("/")[2] if path.startswith("/maps/") else path.split("/")[1]
+        with self._hits_lock:
+            self.hits[kind] = self.hits.get(kind, 0) + 1
+
+    def viewport(self, path: str):
+        """(south, west, north, east) shown by a ``/@lat,lng,zoomz`` search
+        path, using the same Web Mercator approximation as scraper.tiling"""
+        match = VIEWPORT.search(path)
+        if not match:
+            return None
+        lat, lng, zoom = (float(value) for value in match.groups())
+        lng_span = 360 * self.viewport_px / (256 * 2 ** zoom)
+        lat_span = lng_span * math.cos(math.radians(lat))
+        return lat - lat_span / 2, lng - lng_span / 2, lat + lat_span / 2, lng + lng_span / 2
+
+    def search(self, query: str, path: str, params: dict) -> list:
+        """A query's sample of the catalogue or, for a map-positioned search,
+        the places in view; either way at most ``results`` of them, like the
+        real feed's cap"""
+        viewport = self.viewport(path)
+        if viewport is None:
+            place_ids = self.catalogue.search(query)
+        else:
+            place_ids = self.catalogue.within(*viewport)[:self.catalogue.results]
+        return [self.catalogue.place(place_id) for place_id in place_ids]
+
+    def card(self, place: dict) -> str:
+        return CARD.format(href=html.escape(self.catalogue.href(self.base_url, place)), **{
+            key: html.escape(value) if isinstance(value, str) else value for key, value in place.items()
+        })
+
+    def place_from_path(self, path: str):
+        marker = "!1s0x"
+        if marker not in path:
+            return None
+        place_id = int(path.split(marker)[1].split(":")[0], 16) - 0x39db0000
+        if not 0 <= place_id < self.catalogue.universe:
+            return None
+        return self.catalogue.place(place_id)
+
+    def expected(self, query: str) -> list:
+        """Expected records for ``query``, in feed order"""
+        return [
+            self.catalogue.expected(place, self.catalogue.href(self.base_url, place))
+            for place in (self.catalogue.place(place_id) for place_id in self.catalogue.search(query))
+        ]
+
+    def stop(self) -> None:
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the offline Google Maps stand-in")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--results", type=int, default=50, help="places returned per query")
+    parser.add_argument("--delay", type=float, default=0.3, help="seconds before the feed appends a batch")
+    args = parser.parse_args()
+
+    standin = StandIn(results=args.results, port=args.port, delay=args.delay)
+    print(f"Maps stand-in on {standin.maps_url} (set MAPS_URL to this)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        standin.stop()
+
+
+if __name__ == "__main__":
+    main()
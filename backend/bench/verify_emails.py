@@ -0,0 +1,123 @@
+"""Check the email extractor against saved website pages.
+
+Every ``fixtures/emails/<name>.html`` is compared against ``<name>.json``:
+``emails`` must be exactly the addresses ``scraper.emails.emails_in`` finds
+(in that order), and ``links`` the contact/about pages ``contact_links``
+picks when the page was served from ``url``. The regex scan the lookup
+used before is run over the same pages for comparison; its misses and
+false positives are reported but do not fail the check. Unless
+``--pages-only`` is given, the whole lookup (homepage, then linked contact
+pages) also runs against the stand-in's business websites and must find
+the catalogue's address for every place.
+
+    cd backend
+    python bench/verify_emails.py [--pages-only] [--results 60]
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app"))
+
+from scraper.emails import emails_in, contact_links  # noqa: E402
+
+EMAILS_DIR = os.path.join(BENCH_DIR, "fixtures", "emails")
+
+
+def legacy_emails(text: str) -> list:
+    """The scan EmailEnricher ran before scraper.emails, for comparison"""
+    emails = re.findall(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", text)
+    return [
+        email for email in set(emails)
+        if re.match(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$", email)
+    ]
+
+
+def load_pages():
+    for html_path in sorted(glob.glob(os.path.join(EMAILS_DIR, "*.html"))):
+        with open(html_path, encoding="utf-8") as f:
+            page = f.read()
+        with open(html_path[:-len(".html")] + ".json", encoding="utf-8") as f:
+            expected = json.load(f)
+        yield os.path.basename(html_path), page, expected
+
+
+def check_pages() -> int:
+    failures = 0
+    found = wanted = false_positives = legacy_found = legacy_false_positives = 0
+    for name, page, expected in load_pages():
+        emails = emails_in(page)
+        links = contact_links(page, expected["url"])
+        mismatches = {
+            field: (want, got)
+            for field, want, got in (("emails", expected["emails"], emails), ("links", expected["links"], links))
+            if want != got
+        }
+        if mismatches:
+            failures += 1
+            print(f"FAIL {name}")
+            for field, (want, got) in mismatches.items():
+                print(f"    {field}: expected {want!r}, got {got!r}")
+        else:
+            print(f"ok   {name}")
+
+        want = {email.lower() for email in expected["emails"]}
+        got = {email.lower() for email in emails}
+        legacy = {email.lower() for email in legacy_emails(page)}
+        wanted += len(want)
+        found += len(want & got)
+        false_positives += len(got - want)
+        legacy_found += len(want & legacy)
+        legacy_false_positives += len(legacy - want)
+
+    print(f"extractor: {found}/{wanted} addresses found, {false_positives} false positives")
+    print(f"legacy:    {legacy_found}/{wanted} addresses found, {legacy_false_positives} false positives")
+    return failures
+
+
+def check_sites(results: int) -> int:
+    """Look up every stand-in place's website and compare with the catalogue"""
+    from standin import StandIn
+    from run import QUERY
+    from scraper.enrichment import EmailEnricher
+    from scraper.common import JobContext
+
+    standin = StandIn(results=results, sites=2)
+    enricher = EmailEnricher(max_workers=8, per_host=4)
+    failures = 0
+    try:
+        places = [record for record in standin.expected(QUERY) if record["Website"]]
+        lookups = [({"Website": record["Website"]}, record) for record in places]
+        futures = [enricher.submit(lookup, JobContext()) for lookup, _ in lookups]
+        enricher.wait(futures, JobContext())
+        for lookup, record in lookups:
+            email = lookup.get("email")
+            if email != record["email"]:
+                failures += 1
+                print(f"FAIL {record['Website']}: expected {record['email']!r}, got {email!r}")
+        print(f"{'ok  ' if not failures else 'FAIL'} {len(places) - failures}/{len(places)} stand-in websites")
+    finally:
+        enricher.close()
+        standin.stop()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages-only", action="store_true", help="skip the stand-in website lookups")
+    parser.add_argument("--results", type=int, default=60, help="stand-in places whose websites are looked up")
+    args = parser.parse_args()
+
+    failures = check_pages()
+    if not args.pages_only:
+        failures += check_sites(args.results)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Check that the place-page extraction engines produce the saved records.
+
+Every ``fixtures/places/<name>.html`` is compared against ``<name>.json``:
+the BeautifulSoup engine always, and the in-browser script engine too unless
+``--soup-only`` is given (that part needs Chromium). The http engine fetches
+every recorded server response ``fixtures/server/<name>.html`` from the
+local stand-in and must produce ``<name>.json``, or fall back to the browser
+where that file is ``null``.
+
+    cd backend
+    python bench/verify_extraction.py [--soup-only] [--headless 0]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app"))
+
+from scraper.extract import parse_place_html  # noqa: E402
+
+PLACES_DIR = os.path.join(BENCH_DIR, "fixtures", "places")
+SERVER_DIR = os.path.join(BENCH_DIR, "fixtures", "server")
+
+
+def load_fixtures():
+    for html_path in sorted(glob.glob(os.path.join(PLACES_DIR, "*.html"))):
+        with open(html_path, encoding="utf-8") as f:
+            html = f.read()
+        with open(html_path[:-len(".html")] + ".json", encoding="utf-8") as f:
+            expected = json.load(f)
+        yield html_path, html, expected
+
+
+def diff(expected: dict, actual: dict) -> dict:
+    # The Maps URL depends on where the page was loaded from
+    return {
+        field: (value, actual.get(field))
+        for field, value in expected.items()
+        if field != "Google Maps URL" and actual.get(field) != value
+    }
+
+
+def check_http() -> int:
+    """Fetch the recorded server responses through the stand-in; returns the failures"""
+    from standin import StandIn
+    from scraper.fetch import PlaceFetcher
+    from scraper.common import JobContext
+
+    standin = StandIn(results=1, sites=0)
+    fetcher = PlaceFetcher(max_workers=1)
+    failures = 0
+    try:
+        for html_path in sorted(glob.glob(os.path.join(SERVER_DIR, "*.html"))):
+            name = os.path.basename(html_path)[:-len(".html")]
+            with open(html_path[:-len(".html")] + ".json", encoding="utf-8") as f:
+                expected = json.load(f)
+            record = fetcher.fetch(f"{standin.maps_url}/place/fixture/{name}", JobContext())
+            if expected is None:
+                ok = record is None
+                mismatches = {} if ok else {"fallback": ("browser", "http")}
+            else:
+                mismatches = diff(expected, record or {})
+            if mismatches:
+                failures += 1
+                print(f"FAIL server/{name}.html [http]")
+                for field, (want, got) in mismatches.items():
+                    print(f"    {field}: expected {want!r}, got {got!r}")
+            else:
+                print(f"ok   server/{name}.html [http]")
+    finally:
+        fetcher.close()
+        standin.stop()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--soup-only", action="store_true", help="skip the browser-based script engine")
+    parser.add_argument("--headless", type=int, default=1)
+    args = parser.parse_args()
+
+    driver = None
+    if not args.soup_only:
+        from scraper.parser import Parser
+        from scraper.pool import create_driver
+        from scraper.common import JobContext
+        driver = create_driver(args.headless)
+        browser_parser = Parser(driver, JobContext(), engine="script")
+
+    failures = 0
+    try:
+        for html_path, html, expected in load_fixtures():
+            name = os.path.basename(html_path)
+            engines = {"soup": parse_place_html(html)}
+            if driver:
+                driver.get(f"file://{html_path}")
+                engines["script"] = browser_parser.parse()
+                engines["soup (live page)"] = browser_parser.parse_soup()
+
+            for engine, record in engines.items():
+                mismatches = diff(expected, record or {})
+                if mismatches:
+                    failures += 1
+                    print(f"FAIL {name} [{engine}]")
+                    for field, (want, got) in mismatches.items():
+                        print(f"    {field}: expected {want!r}, got {got!r}")
+                else:
+                    print(f"ok   {name} [{engine}]")
+    finally:
+        if driver:
+            driver.quit()
+
+    failures += check_http()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
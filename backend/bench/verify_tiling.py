@@ -0,0 +1,102 @@
+"""Check tile planning, adaptive splitting and cross-tile merging offline.
+
+The stand-in scatters ``--universe`` places over a fixed area and answers a
+map-positioned search (``/search/<query>/@lat,lng,zoomz``) with the places in
+view, cut off at ``--cap`` like the real feed. Every tile planned by
+``TiledScraper`` is answered straight from the stand-in and the real card
+parser; with ``--browser`` the tiles are scrolled in Chromium instead. Either
+way the merged places must be exactly the places inside the area.
+
+    cd backend
+    python bench/verify_tiling.py [--grid 2] [--cap 60] [--browser]
+"""
+import argparse
+import os
+import queue
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app"))
+
+from standin import StandIn, AREA  # noqa: E402
+
+QUERY = "restaurants in jaipur"
+
+
+def scroll_offline(scraper, standin) -> None:
+    """Stand in for the browser half of ``TiledScraper.run``"""
+    from urllib.parse import urlsplit, unquote_plus
+    from scraper.feed import parse_feed_cards
+
+    work = queue.Queue()
+    for item in scraper.searches():
+        work.put(item)
+    while not work.empty():
+        label, url, tile = work.get()
+        places = standin.search(QUERY, unquote_plus(urlsplit(url).path), {})
+        cards = [card for place in places for card in parse_feed_cards(standin.card(place))]
+        scraper.merge(label, cards)
+        scraper.scrolled(label, tile, cards, work)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--universe", type=int, default=400, help="places in the stand-in's area")
+    parser.add_argument("--cap", type=int, default=60, help="feed length cap of the stand-in")
+    parser.add_argument("--grid", type=int, default=2)
+    parser.add_argument("--max-depth", type=int, default=3)
+    parser.add_argument("--browser", action="store_true", help="scroll the tiles in Chromium")
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--headless", type=int, default=1)
+    args = parser.parse_args()
+
+    standin = StandIn(results=args.cap, universe=args.universe, delay=0.05)
+    os.environ["MAPS_URL"] = standin.maps_url
+    os.environ["EMAIL_CACHE_PATH"] = ""
+    os.environ["PLACE_STORE_PATH"] = ""
+
+    from scraper.tiling import TiledScraper, plan_tiles
+    from scraper.common import JobContext
+    from scraper.feed import place_id
+
+    pool = None
+    try:
+        if args.browser:
+            from scraper.pool import DriverPool
+            pool = DriverPool(size=args.concurrency, headless=args.headless)
+            pool.start()
+        scraper = TiledScraper(
+            QUERY, plan_tiles(AREA, args.grid), pool, context=JobContext(), concurrency=args.concurrency,
+            mode="feed", cap=args.cap, max_depth=args.max_depth
+        )
+        if args.browser:
+            found = {place_id(record["Google Maps URL"]) for record, _ in scraper.run()}
+        else:
+            scroll_offline(scraper, standin)
+            found = set(scraper.places)
+    finally:
+        if pool:
+            pool.close()
+        standin.stop()
+
+    expected = {
+        place_id(standin.catalogue.href(standin.base_url, standin.catalogue.place(i)))
+        for i in standin.catalogue.within(*AREA)
+    }
+    stats = scraper.tile_stats()
+    listed = sum(tile["links_found"] for tile in stats)
+    print(
+        f"{len(stats)} tiles searched ({sum(tile['subdivided'] for tile in stats)} split, "
+        f"deepest level {max(tile['depth'] for tile in stats)}), {listed} results listed, "
+        f"{len(found)} unique places, {listed - len(found)} duplicates merged"
+    )
+    missing, extra = expected - found, found - expected
+    if missing or extra:
+        print(f"FAIL: {len(missing)} places missing, {len(extra)} unexpected")
+        sys.exit(1)
+    print(f"ok: all {len(expected)} places in the area found once")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import pandas as pd
 from typing import Dict, List
@@ -15,106 +17,211 @@ st.set_page_config(
 # Constants
 API_URL = "https://google-maps-scraper-j2r2.onrender.com"
 DEFAULT_QUERY = "paper cup manufactures in jaipur"
+# Seconds to connect, and to wait between events; the backend sends progress every few seconds
+TIMEOUT = (10, 120)
+# Searches whose results are kept in the session, most recent last
+CACHED_SEARCHES = 5
+PAGE_SIZES = [10, 25, 50, 100]
 
-def search_places(query: str, progress_bar) -> Dict:
-    """Send search query to FastAPI backend and return results with progress updates"""
+@st.cache_resource
+def api_session() -> requests.Session:
+    """Keep-alive session for calls to the backend, shared across reruns.
+    Connection errors are retried; a scrape itself is never re-posted."""
+    session = requests.Session()
+    retries = Retry(connect=3, read=0, backoff_factor=0.5, allowed_methods=False)
+    adapter = HTTPAdapter(max_retries=retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def search_places(query: str, progress_bar, table_placeholder) -> Dict:
+    """Stream results from the FastAPI backend, showing rows as they are scraped"""
+    locations = []
+    job_id = None
+    last_render = 0.0
     try:
         # Initialize progress
-        progress_bar.progress(0, "Initializing scraper...")
-        time.sleep(0.5)
-        
-        # Make the API request
-        progress_bar.progress(20, "Connecting to Google Maps...")
-        response = requests.post(
-            f"{API_URL}/scrape",
-            json={"query": query}
-        )
-        response.raise_for_status()
-        
+        progress_bar.progress(0, "Connecting to Google Maps...")
+
+        with api_session().post(
+            f"{API_URL}/scrape/stream",
+            json={"query": query},
+            stream=True,
+            timeout=TIMEOUT
+        ) as response:
+            response.raise_for_status()
+
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+
+                if event["event"] == "started":
+                    job_id = event["job_id"]
+                elif event["event"] == "location":
+                    locations.append(event["data"])
+                    # Redraw the live table at most once a second
+                    if time.monotonic() - last_render >= 1:
+                        last_render = time.monotonic()
+                        table_placeholder.dataframe(pd.DataFrame(locations), use_container_width=True, hide_index=True)
+                elif event["event"] == "progress":
+                    found, parsed = event["links_found"], event["places_parsed"]
+                    percent = min(99, int(parsed / found * 100)) if found else 5
+                    progress_bar.progress(percent, f"Found {found} places, scraped {parsed}...")
+                elif event["event"] == "error":
+                    st.error(event["detail"])
+                    progress_bar.progress(100, "❌ Error occurred")
+
+        table_placeholder.empty()
         # Update progress based on response
-        results = response.json()
-        if results and results.get('total_results', 0) > 0:
+        if locations:
             progress_bar.progress(100, "✅ Scraping completed!")
         else:
             progress_bar.progress(100, "No results found")
-            
-        return results
-        
+
+        return results(locations, job_id)
+
     except requests.exceptions.RequestException as e:
         st.error(f"Error connecting to API: {str(e)}")
         progress_bar.progress(100, "❌ Error occurred")
+        if locations:
+            return results(locations, job_id)
         return None
 
-def display_results(data: Dict) -> None:
+def results(locations: List[Dict], job_id: str) -> Dict:
+    """The results of one search, with everything filtering needs computed once"""
+    df = pd.DataFrame(locations)
+    # One lowercase line of text per row for the filter box
+    haystack = df.astype(str).agg(" ".join, axis=1).str.lower() if len(df) else pd.Series(dtype=str)
+    return {"total_results": len(locations), "df": df, "haystack": haystack, "job_id": job_id}
+
+def cached_search(query: str, refresh: bool, progress_placeholder) -> Dict:
+    """Results for ``query`` from this session, scraping them only when needed"""
+    cache = st.session_state.setdefault("results", {})
+    if query in cache and not refresh:
+        cache[query] = cache.pop(query)
+        return cache[query]
+
+    # Create a progress bar
+    progress_bar = progress_placeholder.progress(0)
+    # Rows appear here while the scrape is running
+    table_placeholder = st.empty()
+    with st.spinner():
+        data = search_places(query, progress_bar, table_placeholder)
+    # Clear the progress bar after completion
+    progress_placeholder.empty()
+
+    cache.pop(query, None)
+    if data:
+        cache[query] = data
+        while len(cache) > CACHED_SEARCHES:
+            cache.pop(next(iter(cache)))
+    return data
+
+def filter_results(data: Dict, key: str) -> pd.DataFrame:
+    """Filter, sort and pick columns of the cached DataFrame"""
+    df = data["df"]
+    if df.empty:
+        return df
+
+    col1, col2, col3, col4 = st.columns([3, 3, 2, 1])
+    with col1:
+        text = st.text_input("Filter", key=f"filter-{key}", placeholder="Text in any column")
+    with col2:
+        columns = st.multiselect("Columns", list(df.columns), default=list(df.columns), key=f"columns-{key}")
+    with col3:
+        sort_by = st.selectbox("Sort by", ["(scraped order)"] + list(df.columns), key=f"sort-{key}")
+    with col4:
+        descending = st.checkbox("Descending", key=f"descending-{key}")
+
+    if text:
+        df = df[data["haystack"].str.contains(text.lower(), regex=False)]
+    if sort_by in df.columns:
+        # Ratings and review counts sort as numbers, everything else as text
+        numbers = pd.to_numeric(df[sort_by], errors="coerce")
+        keys = numbers if numbers.notna().any() else df[sort_by].astype(str).str.lower()
+        df = df.loc[keys.sort_values(ascending=not descending, na_position="last").index]
+    return df[columns or list(df.columns)]
+
+def display_results(data: Dict, key: str) -> None:
     """Display scraped results in a nice format"""
     if not data:
         return
 
     st.subheader(f"Found {data['total_results']} locations")
+    df = filter_results(data, key)
+    if len(df) != data["total_results"]:
+        st.caption(f"{len(df)} match the filter")
 
     # Create tabs for different views
     tab1, tab2 = st.tabs(["📊 Table View", "📝 Detailed View"])
-    
-    # Convert to DataFrame for better display
-    df = pd.DataFrame(data['locations'])
-    
+
     with tab1:
-        # Show interactive table with loading animation
-        with st.spinner("Loading data table..."):
-            st.dataframe(
-                df,
-                use_container_width=True,
-                hide_index=True
-            )
-        
-        # Download section
+        st.dataframe(
+            df,
+            use_container_width=True,
+            hide_index=True
+        )
+        # Download section: the backend streams the files, nothing is built here
         st.write("---")
         st.write("📥 **Download Options**")
-        col1, col2 = st.columns(2)
-        
+        if not data.get("job_id"):
+            st.caption("Downloads are unavailable for this search")
+        else:
+            export_url = f"{API_URL}/jobs/{data['job_id']}/export"
+            col1, col2, col3 = st.columns(3)
+
+            with col1:
+                st.link_button(
+                    "📄 Download CSV",
+                    f"{export_url}?format=csv",
+                    help="Download the data as CSV file"
+                )
+
+            with col2:
+                st.link_button(
+                    "📋 Download JSON Lines",
+                    f"{export_url}?format=jsonl",
+                    help="Download the data as JSON Lines file, one location per line"
+                )
+
+            with col3:
+                st.link_button(
+                    "🧱 Download Parquet",
+                    f"{export_url}?format=parquet",
+                    help="Download the data as Parquet file"
+                )
+
+    with tab2:
+        # Only one page of cards is drawn; the full set of rows would be
+        # thousands of elements on every rerun
+        col1, col2 = st.columns([1, 3])
         with col1:
-            csv = df.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                "📄 Download CSV",
-                csv,
-                "google_maps_data.csv",
-                "text/csv",
-                key='download-csv',
-                help="Download the data as CSV file"
-            )
-        
+            page_size = st.selectbox("Places per page", PAGE_SIZES, key=f"page-size-{key}")
+        pages = max(1, -(-len(df) // page_size))
         with col2:
-            json_str = df.to_json(orient='records')
-            st.download_button(
-                "📋 Download JSON",
-                json_str,
-                "google_maps_data.json",
-                "application/json",
-                key='download-json',
-                help="Download the data as JSON file"
-            )
+            page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key=f"page-{key}-{page_size}")
+        # The full records, so cards still show columns hidden from the table
+        rows = data["df"].loc[df.index[(page - 1) * page_size:page * page_size]]
 
-    with tab2:
-        # Detailed cards view with loading animation
-        with st.spinner("Loading detailed views..."):
-            for loc in data['locations']:
-                with st.expander(f"📍 {loc['name']} - {loc['address']}"):
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        st.write("**Category:**", loc['category'])
-                        st.write("**Rating:**", loc['rating'])
-                        st.write("**Reviews:**", loc['total_reviews'])
-                        st.write("**Status:**", loc['business_status'])
-                        if loc['website']:
-                            st.write("**Website:**", f"[Link]({loc['website']})")
-                    
-                    with col2:
-                        st.write("**Phone:**", loc['phone'])
-                        st.write("**Email:**", loc['email'])
-                        st.write("**Hours:**", loc['hours'])
-                        if loc['google_maps_url']:
-                            st.write("**Maps Link:**", f"[Open in Google Maps]({loc['google_maps_url']})")
+        for loc in rows.to_dict("records"):
+            with st.expander(f"📍 {loc['name']} - {loc['address']}"):
+                col1, col2 = st.columns(2)
+
+                with col1:
+                    st.write("**Category:**", loc['category'])
+                    st.write("**Rating:**", loc['rating'])
+                    st.write("**Reviews:**", loc['total_reviews'])
+                    st.write("**Status:**", loc['business_status'])
+                    if loc['website']:
+                        st.write("**Website:**", f"[Link]({loc['website']})")
+
+                with col2:
+                    st.write("**Phone:**", loc['phone'])
+                    st.write("**Email:**", loc['email'])
+                    st.write("**Hours:**", loc['hours'])
+                    if loc['google_maps_url']:
+                        st.write("**Maps Link:**", f"[Open in Google Maps]({loc['google_maps_url']})")
 
 def main():
     # Header
@@ -131,6 +238,7 @@ def main():
             value=DEFAULT_QUERY,
             help="Enter what you want to search for on Google Maps"
         )
+        refresh = st.checkbox("Scrape again", help="Ignore results already fetched for this query in this session")
         submit_button = st.form_submit_button("🔎 Search")
 
     # Create a placeholder for the progress bar
@@ -141,19 +249,15 @@ def main():
         if not query:
             st.warning("Please enter a search query")
         else:
-            # Create a progress bar
-            progress_bar = progress_placeholder.progress(0)
-            
-            # Show progress status
-            status_text = st.empty()
-            
-            with st.spinner():
-                results = search_places(query, progress_bar)
-                if results:
-                    display_results(results)
-            
-            # Clear the progress bar after completion
-            progress_placeholder.empty()
+            st.session_state["query"] = query
+            cached_search(query, refresh, progress_placeholder)
+
+    # Filtering or paging reruns the script; the results come from the
+    # session instead of another scrape
+    query = st.session_state.get("query")
+    data = st.session_state.get("results", {}).get(query)
+    if data:
+        display_results(data, query)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file